@@ -2,8 +2,9 @@
 Process KoboToolbox export of data in an Excel file and an associated attachment directory.
 """
 
-from models.anchor_row import extract_rows
+from models.anchor_row import extract_rows, anchor_columns
 
+import operator
 import os
 import sys
 
@@ -12,42 +13,109 @@ from pandas import DataFrame
 
 import runtime_args as rt_args
 from utils.anchoring_log import AnchoringLog
+import utils.county_pool as cp
+from utils.files_helper import (copy_report, forget_copied_files, has_copy_manifest, init_attachment_files,
+                                merge_worker_copies)
+from utils.kobo_source import export_pages
+import utils.pandas_helper as ph
 
 
 def main():
     data_year: int = rt_args.select_collection_year()
-    input_xlsx = rt_args.select_database_path()
+    export_source = rt_args.select_database_path()
     attach_dir = rt_args.select_attachment_dir()
     output_dir = rt_args.select_target_dir(data_year)
+    copy_mode = rt_args.select_copy_mode()
 
+    process_export(data_year, export_source, attach_dir, output_dir, copy_mode)
+    print('Done.')
+
+
+def process_export(data_year: int, export_source: str, attach_dir: str, output_dir: str, copy_mode: str = 'copy'):
     user_params = [("Year", str(data_year)),
-                   ("Excel File", input_xlsx),
+                   ("Export", export_source),
                    ("Attachments", attach_dir),
-                   ("Target", output_dir)]
+                   ("Target", output_dir),
+                   ("Output Files", copy_mode)]
 
     rt_args.print_runtime_args(user_params)
 
     print('\n\tcopying attachments to output directory.')
-    df = pd.read_excel(input_xlsx).sort_values("data_county")
-    surveys_by_county = extract_surveys_by_county(df)
-
-    counties = list(surveys_by_county.keys())
-    create_target_directories(counties, output_dir)
-
-    copy_attachments_to_target_dir(surveys_by_county, attach_dir, output_dir)
+    rerun = has_copy_manifest(output_dir)
+    forget_copied_files(copy_mode, output_dir)
+    if rt_args.county_workers > 1:
+        surveys_by_county = process_counties_in_pool(data_year, export_source, attach_dir, output_dir, rerun,
+                                                     copy_mode)
+    else:
+        surveys_by_county = process_counties(data_year, export_source, attach_dir, output_dir, rerun)
+        print('\t\t' + copy_report())
 
     print('\tcreating log file.')
     logger = AnchoringLog(user_params, output_dir, surveys_by_county)
     logger.create_and_write_log(data_year)
 
-    print('Done.')
 
+def process_counties(data_year: int, export_source: str, attach_dir: str, output_dir: str,
+                     existing_output: bool) -> dict:
+    """
+    Every county's surveys, extracted a page of the export at a time.  Each page's attachment copies are queued on
+    the copy threads as soon as it is extracted, so the export download and the copies overlap.
+    """
+    surveys_by_county = dict()
+
+    # pages are fetched ahead on a background thread (see utils.kobo_source)
+    for page in export_pages(export_source, anchor_columns):
+        df = ph.apply_schema(page.sort_values("data_county", kind="stable"), anchor_columns, data_year)
+        page_surveys = extract_surveys_by_county(df)
+
+        new_counties = [cty for cty in page_surveys.keys() if cty not in surveys_by_county]
+        create_target_directories(new_counties, output_dir, existing_output or len(surveys_by_county) > 0)
+        copy_attachments_to_target_dir(page_surveys, attach_dir, output_dir)
+
+        merge_surveys(surveys_by_county, page_surveys)
+
+    return sorted_surveys(surveys_by_county)
+
+
+def process_counties_in_pool(data_year: int, export_source: str, attach_dir: str, output_dir: str,
+                             existing_output: bool, copy_mode: str) -> dict:
+    """As process_counties, with each county's work in a county_workers process, merged in county order."""
+    county_pages = dict()
+    for page in export_pages(export_source, anchor_columns):
+        df = ph.apply_schema(page, anchor_columns, data_year)
+        for cty, county_df in df.groupby('data_county'):
+            county_pages.setdefault(cty, []).append(county_df)
 
-def create_target_directories(c_names, base_dir):
+    # the attachment index is saved before the workers load it
+    init_attachment_files(attach_dir)
+
+    jobs = {cty: (cty, pd.concat(county_pages[cty]), attach_dir, output_dir, existing_output, copy_mode)
+            for cty in sorted(county_pages.keys())}
+    surveys_by_county = cp.run_counties(process_county, jobs, rt_args.county_workers)
+    merge_worker_copies()
+
+    return surveys_by_county
+
+
+def process_county(cty: str, df: DataFrame, attach_dir: str, output_dir: str, existing_output: bool,
+                   copy_mode: str) -> list:
+    """One county's surveys, with their attachments copied, in a county_workers process."""
+    create_target_directories([cty], output_dir, existing_output)
+    forget_copied_files(copy_mode, output_dir, worker=cty)
+
+    surveys_by_county = {cty: extract_rows(df)}
+    copy_attachments_to_target_dir(surveys_by_county, attach_dir, output_dir)
+    print('\t\t{}: {}'.format(cty, copy_report()))
+
+    return surveys_by_county[cty]
+
+
+def create_target_directories(c_names, base_dir, exist_ok: bool = False):
+    # a repeated run (see has_copy_manifest) updates an existing output directory
     try:
         for cty_name in c_names:
             cty_path = os.path.join(base_dir, cty_name, 'site_photos')
-            os.makedirs(cty_path)
+            os.makedirs(cty_path, exist_ok=exist_ok)
     except FileExistsError:
         print("Invalid output directory.  Make sure directory does not exist, or is writable")
 
@@ -62,6 +130,17 @@ def extract_surveys_by_county(df: DataFrame) -> dict:
     return surveys_by_county
 
 
+def merge_surveys(surveys_by_county: dict, page_surveys: dict):
+    for cty in page_surveys.keys():
+        surveys_by_county.setdefault(cty, []).extend(page_surveys[cty])
+
+
+def sorted_surveys(surveys_by_county: dict) -> dict:
+    # the order extract_rows gives a whole export
+    return {cty: sorted(surveys_by_county[cty], key=operator.attrgetter("location", "survey_date"))
+            for cty in sorted(surveys_by_county.keys())}
+
+
 def copy_attachments_to_target_dir(surveys_by_county: dict, attachments_dir: str, target: str):
     for county in surveys_by_county.keys():
         cnty_dir = os.path.join(target, county, 'site_photos')
@@ -0,0 +1,81 @@
+"""
+Process several KoboToolbox exports (e.g. every year of the archive after a model change) in one run.  The attachment
+indexes, NOAA station and tidal correction lookups, NOAA cache and HTTP sessions are built once and shared by every
+job, so later jobs start warm.
+
+The jobs file is a CSV file with a header row and one export per row:
+    survey,year,excel,attachments,output,start_date,incremental,link
+    kelp,2023,/path/Kelp_Data_2023.xlsx,/path/2023_attachments,/path/out/2023,,n,y
+    anchoring,2023,/path/Anchoring_2023.xlsx,/path/2023_anchoring_attachments,/path/out/anchoring_2023,,n,n
+
+excel may be any export kelp.py reads (e.g. a CSV export or kobo:<asset uid>).  start_date, incremental and link are
+optional; start_date and incremental are only used for kelp exports.  link = y links the output files to the
+attachments instead of copying them (blank = default_copy_mode in runtime_args.py).
+"""
+import csv
+import sys
+import time
+
+import runtime_args as rt_args
+import anchoring
+import kelp
+
+
+def main():
+    jobs_path = select_jobs_path()
+    jobs = read_jobs(jobs_path)
+
+    print("\nRuntime parameters")
+    print('\tJobs File: ' + jobs_path)
+    print('\tJobs: ' + str(len(jobs)))
+
+    for i, job in enumerate(jobs, start=1):
+        print('\nJob {} of {}: {} {}'.format(i, len(jobs), job['survey'], job['year']))
+        start = time.perf_counter()
+        run_job(job)
+        print('\tjob finished in {:.1f}s'.format(time.perf_counter() - start))
+
+    print('Done.')
+
+
+def select_jobs_path() -> str:
+    jobs_path = input("Enter batch jobs file (.csv): ").strip()
+    if len(jobs_path) > 0:
+        return jobs_path
+
+    return rt_args.default_batch_jobs
+
+
+def read_jobs(jobs_path: str) -> list:
+    with open(jobs_path, newline='', encoding='utf-8') as f:
+        rows = [{k.strip(): (v or '').strip() for k, v in row.items() if k} for row in csv.DictReader(f)]
+
+    jobs = [row for row in rows if row.get('survey')]
+    for job in jobs:
+        if job['survey'] not in ('kelp', 'anchoring'):
+            raise ValueError('Unknown survey type {} in {}'.format(job['survey'], jobs_path))
+
+    return jobs
+
+
+def job_copy_mode(job: dict) -> str:
+    link = job.get('link', '').lower()
+    if len(link) > 0:
+        return 'link' if link.startswith('y') else 'copy'
+
+    return rt_args.default_copy_mode
+
+
+def run_job(job: dict):
+    year = int(job['year'])
+    copy_mode = job_copy_mode(job)
+    if job['survey'] == 'anchoring':
+        anchoring.process_export(year, job['excel'], job['attachments'], job['output'], copy_mode)
+    else:
+        incremental = job.get('incremental', '').lower().startswith('y')
+        kelp.process_export(year, job['excel'], job.get('start_date', ''), job['attachments'], job['output'],
+                            incremental, copy_mode)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
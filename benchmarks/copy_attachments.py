@@ -0,0 +1,78 @@
+"""
+Compare sequential and concurrent attachment copying, and linking, on a synthetic attachment tree (thousands of photo
+sized files).  Enter a directory on the network share the output usually goes to: on a local disk both copy paths are
+limited by memory bandwidth, and the workers gain little.  Links need the destination on the attachments' drive, and
+fall back to copies elsewhere.
+
+Run from the repository directory:
+    python -m benchmarks.copy_attachments
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import utils.files_helper as fh
+from utils.copy_engine import CopyEngine
+
+file_count = 3000
+file_bytes = 256 * 1024
+
+
+def synthetic_attachments(src: str) -> list:
+    # Kobo puts each submission's attachments in its own directory
+    payload = os.urandom(file_bytes)
+    names = []
+    for i in range(file_count):
+        sub_dir = os.path.join(src, 'submission_{:04d}'.format(i // 10))
+        os.makedirs(sub_dir, exist_ok=True)
+        name = 'IMG_{:05d}.jpg'.format(i)
+        with open(os.path.join(sub_dir, name), 'wb') as f:
+            f.write(payload)
+        names.append(name)
+
+    return names
+
+
+def timed_copy(label: str, workers: int, names: list, src: str, dest: str, copy_mode: str = 'copy') -> float:
+    os.makedirs(dest)
+    fh.copier = CopyEngine(workers, progress_every=0)
+    fh.forget_copied_files(copy_mode)
+
+    start = time.perf_counter()
+    for i, name in enumerate(names):
+        fh.copy_file_if_exists('survey_{}'.format(i // 10), src, dest, name, '_Kelp{}'.format(i % 10))
+    report = fh.copy_report().rstrip('.')
+    secs = time.perf_counter() - start
+
+    print('{:>22}: {} in {:.2f}s'.format(label, report, secs))
+    return secs
+
+
+def select_dest_dir(tmp_dir: str) -> str:
+    candidate = input("Enter destination directory (blank = temporary directory): ").strip()
+    if len(candidate) > 0:
+        return candidate
+
+    return tmp_dir
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        dest_dir = tempfile.mkdtemp(prefix='copy_benchmark_', dir=select_dest_dir(tmp_dir))
+        src = os.path.join(tmp_dir, 'attachments')
+        names = synthetic_attachments(src)
+        print('{} files of {} KB to {}'.format(file_count, file_bytes // 1024, dest_dir))
+
+        try:
+            sequential = timed_copy('sequential', 1, names, src, os.path.join(dest_dir, 'out_1'))
+            concurrent = timed_copy('8 workers', 8, names, src, os.path.join(dest_dir, 'out_8'))
+            linked = timed_copy('link', 8, names, src, os.path.join(dest_dir, 'out_link'), 'link')
+            print('speedup {:.1f}x, link {:.1f}x'.format(sequential / concurrent, sequential / linked))
+        finally:
+            shutil.rmtree(dest_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
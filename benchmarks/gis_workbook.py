@@ -0,0 +1,82 @@
+"""
+Compare writing a GIS worksheet the old way (a DataFrame appended to an in-memory workbook, then every number cell
+formatted) with the streaming write-only writer, for time and peak memory, on synthetic rows.
+
+Run from the repository directory:
+    python -m benchmarks.gis_workbook
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import fields
+
+from openpyxl.workbook import Workbook
+from openpyxl.utils.dataframe import dataframe_to_rows
+from pandas import DataFrame
+
+from models.kelp_data_frame import GISData, number_columns, row_header_labels, write_gis_worksheet
+
+row_count = 10000
+
+
+def synthetic_rows(count: int) -> list:
+    rnd = random.Random(1)
+
+    def value(f):
+        if f.type is float:
+            return rnd.choice([float('NaN'), round(rnd.uniform(0.5, 12.0), 2)])
+        if f.type is int:
+            return rnd.randrange(100)
+        return rnd.choice(['', '{} {}'.format(f.name, rnd.randrange(1000))])
+
+    return [GISData(*(value(f) for f in fields(GISData))) for _ in range(count)]
+
+
+def in_memory_worksheet(gis_data: list, destination: str):
+    wb = Workbook()
+    ws = wb.active
+    for r in dataframe_to_rows(DataFrame(gis_data), index=False, header=True):
+        ws.append(r)
+
+    for i, label in enumerate(row_header_labels(), start=1):
+        ws.cell(1, i).value = label
+    for c in number_columns:
+        for i in range(2, ws.max_row + 1):
+            ws[c + str(i)].number_format = '0.00'
+
+    wb.save(destination)
+
+
+def measured(label: str, write, gis_data: list, destination: str) -> tuple:
+    start = time.perf_counter()
+    write(gis_data, destination)
+    secs = time.perf_counter() - start
+
+    # traced separately: tracemalloc slows the writers down several times
+    tracemalloc.start()
+    write(gis_data, destination)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    print('{:>12}: {:.2f}s, peak {:7.1f} MB'.format(label, secs, peak / 1e6))
+    return secs, peak
+
+
+def main():
+    gis_data = synthetic_rows(row_count)
+    print('{} rows, {} columns'.format(row_count, len(fields(GISData))))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        destination = os.path.join(tmp_dir, 'gisWorksheet.xlsx')
+        old_secs, old_peak = measured('in memory', in_memory_worksheet, gis_data, destination)
+        new_secs, new_peak = measured('streaming', write_gis_worksheet, gis_data, destination)
+
+    print('streaming is {:.1f}x faster and peaks at {:.0%} of the memory'.format(old_secs / new_secs,
+                                                                              new_peak / old_peak))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+"""
+Compare pd.read_excel of a whole Kobo export with the column-pruned loader, cold (parsing the workbook) and warm
+(from the export cache), on a synthetic export.
+
+Run from the repository directory:
+    python -m benchmarks.kobo_load
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import runtime_args as rt_args
+from models.kelp_row import kelp_columns
+from utils.kobo_loader import load_export
+
+row_count = 2000
+unused_column_count = 150  # "all versions" exports carry every question ever asked
+
+
+def synthetic_export(path: str):
+    columns = {}
+    for spec in kelp_columns:
+        if spec.kind == 'float':
+            columns[spec.name] = [float(i % 40) for i in range(row_count)]
+        else:
+            columns[spec.name] = ['{} {}'.format(spec.name, i) for i in range(row_count)]
+    for c in range(unused_column_count):
+        columns['unused_{}'.format(c)] = ['unused answer {}'.format(i) for i in range(row_count)]
+
+    pd.DataFrame(columns).to_excel(path, index=False)
+
+
+def timed(label: str, load) -> float:
+    start = time.perf_counter()
+    load()
+    secs = time.perf_counter() - start
+    print('{:>28}: {:.2f}s'.format(label, secs))
+    return secs
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rt_args.kobo_cache_dir = os.path.join(tmp_dir, 'kobo_cache')
+        export_path = os.path.join(tmp_dir, 'export.xlsx')
+        synthetic_export(export_path)
+        print('{} rows, {} columns ({} used)'.format(row_count, len(kelp_columns) + unused_column_count,
+                                                     len(kelp_columns)))
+
+        full = timed('pd.read_excel', lambda: pd.read_excel(export_path))
+        cold = timed('load_export (cold)', lambda: load_export(export_path, kelp_columns))
+        warm = timed('load_export (warm)', lambda: load_export(export_path, kelp_columns))
+        print('speedup cold {:.1f}x, warm {:.0f}x'.format(full / cold, full / warm))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Compare sequential and concurrent NOAA fetching against a local stub server that adds artificial latency.
+
+Run from the repository directory:
+    python -m benchmarks.noaa_fetch
+"""
+import json
+import random
+import sys
+import threading
+import time
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import runtime_args as rt_args
+
+latency_secs = 0.05
+survey_count = 300
+
+
+class StubNoaaHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        time.sleep(latency_secs)
+        parts = urlsplit(self.path)
+
+        if parts.path.endswith('/datagetter'):
+            reply = water_level_reply(parse_qs(parts.query))
+        elif parts.path.endswith('/tidepredoffsets.json'):
+            reply = {'refStationId': '', 'type': 'R', 'heightOffsetHighTide': 0.0, 'heightOffsetLowTide': 0.0,
+                     'timeOffsetHighTide': 0, 'timeOffsetLowTide': 0, 'heightAdjustedType': 'F'}
+        else:
+            stn_id = parts.path.rsplit('/', 1)[-1].split('.')[0]
+            reply = {'stations': [{'id': stn_id, 'name': 'Stub ' + stn_id}]}
+
+        body = json.dumps(reply).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def water_level_reply(query: dict) -> dict:
+    begin = datetime.strptime(query['begin_date'][0], '%Y%m%d %H:%M')
+    end = datetime.strptime(query['end_date'][0], '%Y%m%d %H:%M')
+    step = timedelta(minutes=1 if query['product'][0] == 'one_minute_water_level' else 6)
+
+    data = []
+    t = begin
+    while t <= end:
+        data.append({'t': t.strftime('%Y-%m-%d %H:%M'), 'v': '{:.3f}'.format(1.5 + t.minute / 100.0)})
+        t += step
+    return {'data': data}
+
+
+def synthetic_surveys(count: int) -> dict:
+    from models.tidal_station import TidalStation, known_stations
+    from noaa.mllw_adjuster import create_depth_adjuster
+
+    class Survey:
+        def __init__(self, station, survey_date, start_time):
+            self.tide_station = station
+            self.depth_adjuster = create_depth_adjuster(station, survey_date, start_time)
+
+    rnd = random.Random(42)
+    stations = [TidalStation(s.name, s.id) for s in known_stations.values()]
+    surveys = []
+    for i in range(count):
+        dt = datetime(2023, 7, 1, 8, 0) + timedelta(days=rnd.randrange(60), minutes=rnd.randrange(480))
+        surveys.append(Survey(rnd.choice(stations), dt.date(), dt.time()))
+
+    return {'synthetic': surveys}
+
+
+def timed_run(workers: int) -> tuple:
+    import noaa.wtr_lvl_query as wlq
+    from noaa.concurrent_fetcher import warm_noaa_data
+
+    wlq.known_series.clear()
+    surveys = synthetic_surveys(survey_count)
+
+    start = time.perf_counter()
+    request_count = warm_noaa_data(surveys, workers)
+    return time.perf_counter() - start, request_count
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubNoaaHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    rt_args.noaa_api_host = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    rt_args.noaa_cache_enabled = False
+    rt_args.noaa_requests_per_second = 0.0
+
+    import noaa.api_fetcher as naf
+    naf.rate_limiter.min_interval = 0.0
+
+    print('{} surveys, {:.0f} ms stub latency'.format(survey_count, latency_secs * 1000))
+    seq_secs, seq_requests = timed_run(1)
+    print('\tsequential:       {:6.2f} s  ({} water level requests)'.format(seq_secs, seq_requests))
+
+    workers = rt_args.noaa_workers
+    par_secs, par_requests = timed_run(workers)
+    print('\t{:2d} workers:       {:6.2f} s  ({} water level requests)'.format(workers, par_secs, par_requests))
+    print('\tspeedup:          {:6.1f}x'.format(seq_secs / par_secs))
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Memory held by 10k kelp surveys as dict-based dataclasses (the old layout), slotted dataclasses, and a SurveyTable.
+
+Run from the repository directory:
+    python -m benchmarks.survey_memory
+"""
+import gc
+import random
+import sys
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+from models.attachments import DataSetAttachments
+from models.cluster_point import KelpClusterPoint
+from models.kelp_row import KelpSurvey
+from models.site_images import SurveySiteImages
+from models.survey_table import SurveyTable, record_fields
+from models.tidal_station import known_stations
+from models.volunteer_info import VolunteerInfo
+
+survey_count = 10000
+
+
+def synthetic_surveys(count: int) -> list:
+    # like a real export: most optional text and attachment fields are empty
+    rnd = random.Random(1)
+    stations = list(known_stations.values())
+
+    def maybe(text: str, p: float = 0.3) -> str:
+        return text if rnd.random() < p else ''
+
+    def depth() -> float:
+        return rnd.choice([float('NaN'), round(rnd.uniform(0.5, 12.0), 2)])
+
+    surveys = []
+    for i in range(count):
+        stn = rnd.choice(stations)
+        photo = 'IMG_{:05d}-{}.jpg'.format(i, rnd.randrange(1000))
+        surveys.append(KelpSurvey(
+            '2023-{:02d}-{:02d}'.format(rnd.randint(6, 9), rnd.randint(1, 28)), 'bed_{}'.format(rnd.randrange(60)), i,
+            rnd.choice(['clallam', 'jefferson', 'san_juan', 'skagit', 'snohomish', 'whatcom']),
+            rnd.choice(['sunny', 'overcast', 'rain']), depth(), stn.name, stn,
+            '10:15:00.000-07:00', '12:40:00.000-07:00',
+            maybe('kelp bed healthy'), maybe('notes'), depth(), 12.5, depth(), 12.0, depth(), 11.0, depth(), 11.5,
+            maybe('obs 1'), maybe('obs 2'), '', '', 'uuid-{:08d}'.format(i), '2023-10-01T10:00:00', maybe('track.gpx'),
+            SurveySiteImages('', '', photo, '', maybe(photo), maybe(photo), '', ''),
+            DataSetAttachments(photo, maybe(photo), maybe('track.gpx', 0.8), '', '', '', '', ''),
+            VolunteerInfo('Lead Volunteer', 'A. Volunteer, B. Volunteer', maybe(photo), '', '', ''),
+            [KelpClusterPoint('wp{}'.format(j), depth(), 12.0, '') for j in range(rnd.choice([0, 0, 1, 2]))]))
+
+    return surveys
+
+
+def unslotted(cls):
+    # the same fields as cls in a plain (per instance __dict__) dataclass
+    return make_dataclass(cls.__name__, [(f.name, f.type) for f in fields(cls)])
+
+
+def copied(surveys: list, survey_cls, record_cls: dict, cluster_cls) -> list:
+    def convert(s: KelpSurvey):
+        values = {f.name: getattr(s, f.name) for f in fields(KelpSurvey)}
+        for name, cls in record_cls.items():
+            record = values[name]
+            values[name] = cls(*(getattr(record, f.name) for f in fields(record)))
+        values['kelp_clusters'] = [cluster_cls(c.gps_point_name, c.depth, c.water_temp, c.observations)
+                                   for c in s.kelp_clusters]
+        return survey_cls(**values)
+
+    return [convert(s) for s in surveys]
+
+
+def as_unslotted(surveys: list) -> list:
+    record_cls = {name: unslotted(record_type) for name, record_type in record_fields.items()}
+    return copied(surveys, unslotted(KelpSurvey), record_cls, unslotted(KelpClusterPoint))
+
+
+def as_slotted(surveys: list) -> list:
+    return copied(surveys, KelpSurvey, record_fields, KelpClusterPoint)
+
+
+def measured(label: str, build) -> int:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+
+    print('{:>22}: {:8.2f} MB'.format(label, size / 1e6))
+    return size
+
+
+def main():
+    # the strings themselves come from the export in every layout, so build them outside the measurements
+    surveys = synthetic_surveys(survey_count)
+    print('{} surveys'.format(survey_count))
+
+    plain = measured('dict dataclasses', lambda: as_unslotted(surveys))
+    slotted = measured('slotted dataclasses', lambda: as_slotted(surveys))
+    table = measured('SurveyTable', lambda: SurveyTable(surveys))
+    print('slotted saves {:.0%}, SurveyTable saves {:.0%}'.format(1 - slotted / plain, 1 - table / plain))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
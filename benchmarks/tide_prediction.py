@@ -0,0 +1,46 @@
+"""
+Compare the harmonic predictor (noaa/harmonic_predictor.py) with NOAA's published tide predictions for one reference
+station over a day, so a wrong constituent argument (e.g. the diurnal phases) shows up as a large difference.  Needs
+network access to NOAA.
+
+Run from the repository directory:
+    python -m benchmarks.tide_prediction
+"""
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import noaa.api_fetcher as naf
+import noaa.harmonic_predictor as hp
+
+station_id = 9447130  # Seattle, with large diurnal (K1, O1) constituents
+day = datetime(2024, 6, 20)
+tolerance_m = 0.10
+
+
+def main():
+    # straight to NOAA: predictions are not water levels, and do not belong in the reply cache
+    reply = naf.request_water_data_reply(station_id, day, day + timedelta(days=1), 'predictions')
+    if 'predictions' not in reply:
+        print('No NOAA predictions: {}'.format(reply.get('error', reply)))
+        return 1
+
+    times = [datetime.strptime(p['t'], '%Y-%m-%d %H:%M') for p in reply['predictions']]
+    published = np.array([float(p['v']) for p in reply['predictions']])
+    predicted = hp.predict_mllw_heights(station_id, times)
+
+    diff = predicted - published
+    print('station {}, {} predictions on {}'.format(station_id, len(times), day.date()))
+    print('difference from NOAA: mean {:+.3f} m, rms {:.3f} m, max {:.3f} m'.format(
+        diff.mean(), np.sqrt((diff ** 2).mean()), np.abs(diff).max()))
+
+    if np.abs(diff).max() > tolerance_m:
+        print('predictions differ from NOAA by more than {:.2f} m'.format(tolerance_m))
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
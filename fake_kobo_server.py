@@ -0,0 +1,106 @@
+"""
+Serve a local export through a stand-in for the KoboToolbox v2 data API (paged JSON, with 'next' links), for testing
+kobo:<asset uid> sources without a Kobo account.  Set kobo_api_host in runtime_args.py to the printed address; any
+asset uid serves the same export.
+"""
+import json
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import numpy as np
+import pandas as pd
+
+import runtime_args as rt_args
+
+default_port: int = 8766
+group_name = 'survey_info'  # Kobo names answers inside groups "group_name/question_name"
+
+
+def as_submissions(df: pd.DataFrame) -> list:
+    # like the API: text values, no export row _index
+    df = df.drop(columns=['_index'], errors='ignore')
+    df = df.astype(object).where(df.notna(), None)
+    submissions = []
+    for row in df.to_dict(orient='records'):
+        submission = {}
+        for k, v in row.items():
+            if isinstance(v, (pd.Timestamp, np.datetime64)):
+                v = pd.Timestamp(v).isoformat()
+            elif isinstance(v, np.generic):
+                v = v.item()
+            key = k if str(k).startswith('_') else group_name + '/' + str(k)
+            submission[key] = None if v is None else str(v)
+        submissions.append(submission)
+
+    return submissions
+
+
+def create_handler(submissions: list, latency_secs: float):
+    class KoboHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parts = urlsplit(self.path)
+            if not parts.path.endswith('/data.json'):
+                self.send_error(404)
+                return
+
+            time.sleep(latency_secs)
+            query = parse_qs(parts.query)
+            start = int(query.get('start', ['0'])[0])
+            limit = int(query.get('limit', ['100'])[0])
+
+            next_url = None
+            if start + limit < len(submissions):
+                next_url = 'http://{}{}?limit={}&start={}'.format(self.headers['Host'], parts.path, limit, start + limit)
+            reply = {'count': len(submissions), 'next': next_url, 'results': submissions[start:start + limit]}
+
+            body = json.dumps(reply).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return KoboHandler
+
+
+def select_latency() -> float:
+    candidate = input("Enter latency per page in seconds (blank = 0): ").strip()
+    if len(candidate) > 0:
+        return float(candidate)
+
+    return 0.0
+
+
+def select_port() -> int:
+    candidate = input("Enter port (blank = {}): ".format(default_port)).strip()
+    if len(candidate) > 0:
+        return int(candidate)
+
+    return default_port
+
+
+def main():
+    input_xlsx = rt_args.select_database_path()
+    latency_secs = select_latency()
+    port = select_port()
+
+    submissions = as_submissions(pd.read_excel(input_xlsx))
+    server = ThreadingHTTPServer(('127.0.0.1', port), create_handler(submissions, latency_secs))
+
+    rt_args.print_runtime_args([("Excel File", input_xlsx),
+                                ("Submissions", str(len(submissions))),
+                                ("Latency (secs)", str(latency_secs)),
+                                ("Address", 'http://127.0.0.1:{}'.format(port))])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('Done.')
+
+
+if __name__ == "__main__":
+    sys.exit(main())
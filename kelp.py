@@ -1,52 +1,314 @@
 """
 Process KoboToolbox export of data in an Excel file and an associated attachment directory.
+
+Run with --resume to continue a run that died part way, in the same output directory (see utils/run_journal.py).
 """
+import asyncio
+import operator
 import os
 import sys
 
 import pandas as pd
 from pandas import DataFrame
 
-from models.kelp_data_frame import create_gis_excel_workbook
-from models.kelp_row import extract_rows
-from utils.files_helper import copy_beach_images_to
+from models.kelp_data_frame import GISData, create_gis_excel_workbook, gis_rows
+from models.kelp_row import extract_rows, kelp_columns
+from noaa.concurrent_fetcher import warm_noaa_data
+import noaa.api_fetcher as naf
+import utils.county_pool as cp
+from utils.files_helper import (copy_beach_images_to, copy_intervals, copy_report, forget_copied_files,
+                                has_copy_manifest, init_attachment_files, merge_worker_copies)
 from utils.kelp_log import KelpDataLog
+from utils.kobo_source import export_pages
+import utils.run_journal as rj
+import utils.run_manifest as rm
+import utils.pandas_helper as ph
+from utils.stage_timeline import StageTimeline
 
 import runtime_args as rt_args
 
 
 def main():
+    if '--resume' in sys.argv[1:]:
+        return resume_export()
+
     data_year: int = rt_args.select_collection_year()
-    input_xlsx = rt_args.select_database_path()
+    export_source = rt_args.select_database_path()
     start_date = select_start_date()
     attach_dir = rt_args.select_attachment_dir()
     output_dir = rt_args.select_target_dir(data_year)
+    incremental = rt_args.select_incremental()
+    copy_mode = rt_args.select_copy_mode()
+
+    if rj.load_journal(output_dir) is not None:
+        print(unfinished_run_message(output_dir))
+        return 1
+
+    process_export(data_year, export_source, start_date, attach_dir, output_dir, incremental, copy_mode)
+    print('Done.')
+
+
+def unfinished_run_message(output_dir: str) -> str:
+    return ('A run in {} did not finish: continue it with kelp.py --resume, or remove its {} to start again'
+            .format(output_dir, rj.journal_name))
+
+
+def resume_export():
+    data_year: int = rt_args.select_collection_year()
+    output_dir = rt_args.select_target_dir(data_year)
+
+    journal = rj.load_journal(output_dir)
+    if journal is None:
+        print('No interrupted run to resume in ' + output_dir)
+        return 1
+
+    params = journal.params
+    process_export(params['year'], params['export'], params['start_date'], params['attachments'], output_dir,
+                   params['incremental'], params['copy_mode'], resume=True)
+    print('Done.')
+
 
+def process_export(data_year: int, export_source: str, start_date: str, attach_dir: str, output_dir: str,
+                   incremental: bool = False, copy_mode: str = 'copy', resume: bool = False):
+    run_params = {'year': data_year, 'export': export_source, 'start_date': start_date, 'attachments': attach_dir,
+                  'incremental': incremental, 'copy_mode': copy_mode}
     user_params = [("Year", str(data_year)),
-                   ("Excel File", input_xlsx),
+                   ("Export", export_source),
                    ("Attachments", attach_dir),
-                   ("Start Date", start_date),
-                   ("Target", output_dir)]
+                   ("Start Date", start_date if start_date else "all submissions"),
+                   ("Target", output_dir),
+                   ("Incremental", "yes" if incremental else "no"),
+                   ("Output Files", copy_mode)]
 
     rt_args.print_runtime_args(user_params)
+    timeline = StageTimeline()
 
-    print('\n\tcopying attachments to output directory.')
-    df = pd.read_excel(input_xlsx).sort_values("data_county")
-    surveys_by_county = extract_surveys_by_county(df)
+    # each stage and each county's GIS rows are journaled; copied files and NOAA replies are recorded as they finish.
+    # A resumed run skips the stages its journal records as completed.
+    journal = rj.load_journal(output_dir)
+    if journal is not None and not resume:
+        raise ValueError(unfinished_run_message(output_dir))
+    if journal is None:
+        journal = rj.start_journal(output_dir, run_params)
+    else:
+        print('\tresuming after stage: {}, {} GIS rows done.'.format(journal.last_stage(), len(journal.gis)))
 
-    counties = list(surveys_by_county.keys())
-    create_target_directories(counties, output_dir)
+    print('\n\tcopying attachments to output directory.')
+    rerun = has_copy_manifest(output_dir)
+    forget_copied_files(copy_mode, output_dir, copy_files='copies' not in journal.stages)
+    manifest = rm.load_manifest(output_dir) if incremental else {}
+    existing_output = incremental or resume or rerun
+    if rt_args.county_workers > 1:
+        with timeline.stage('county workers'):
+            surveys_by_county, hashes, known_rows = process_counties_in_pool(
+                data_year, export_source, start_date, attach_dir, output_dir, existing_output, copy_mode, manifest,
+                journal)
+    else:
+        surveys_by_county, hashes, known_rows = asyncio.run(process_counties(
+            data_year, export_source, start_date, attach_dir, output_dir, existing_output, manifest, journal,
+            timeline))
 
-    copy_attachments_to_target_dir(surveys_by_county, attach_dir, output_dir)
+    if 'gis' in journal.stages:
+        print('\tGIS Worksheet already exported.')
+    else:
+        print('\texporting GIS Worksheet.')
+        with timeline.stage('GIS worksheet'):
+            gis_data = create_gis_excel_workbook(surveys_by_county, output_dir, data_year, known_rows)
 
-    print('\texporting GIS Worksheet.')
-    create_gis_excel_workbook(surveys_by_county, output_dir, data_year)
+            all_surveys = [ks for cty in surveys_by_county.keys() for ks in surveys_by_county[cty]]
+            rm.save_manifest(output_dir, hashes, all_surveys, gis_data)
+            journal.completed('gis')
 
     print('\tcreating log file.')
-    logger = KelpDataLog(user_params, output_dir, surveys_by_county)
-    logger.create_and_write_log(data_year)
+    with timeline.stage('log'):
+        logger = KelpDataLog(user_params, output_dir, surveys_by_county)
+        logger.create_and_write_log(data_year)
+        journal.finish()
 
-    print('Done.')
+    print('\ttimeline.')
+    for line in timeline.lines():
+        print('\t\t' + line)
+
+
+async def process_counties(data_year: int, export_source: str, start_date: str, attach_dir: str, output_dir: str,
+                           existing_output: bool, manifest: dict, journal: rj.RunJournal,
+                           timeline: StageTimeline) -> tuple:
+    """
+    Extracts, copies and adjusts depths for every county in this process: (surveys by county, hashes, GIS rows).
+    Each page's attachment copies are queued on the copy threads as soon as it is extracted, and its surveys' NOAA
+    water levels fetched by a concurrent task, so the export download, the copies and the NOAA requests overlap.
+    GIS rows are computed once the copies and NOAA requests are both done.
+    """
+    surveys_by_county = dict()
+    changed_by_county = dict()
+    hashes = dict()
+    known_rows = dict()
+    reported_columns = set()
+    noaa_batches = asyncio.Queue()
+    copies_done = 'copies' in journal.stages  # only the attachments' destinations are recorded
+
+    def extract_and_copy(page: DataFrame) -> tuple:
+        with timeline.stage('extract surveys'):
+            df = page.sort_values("data_county", kind="stable")
+            df = submitted_since(clean_export(df, kelp_columns, data_year, reported_columns), start_date, manifest)
+            page_surveys = extract_surveys_by_county(df)
+
+            # unchanged submissions already in the output directory are not copied or adjusted again
+            page_hashes = submission_hashes(df, start_date, manifest)
+            page_changed = changed_surveys(page_surveys, manifest, page_hashes)
+
+        # the copies' own busy time is measured by the copy engine
+        new_counties = [cty for cty in page_surveys.keys() if cty not in surveys_by_county]
+        create_target_directories(new_counties, output_dir, existing_output or len(surveys_by_county) > 0)
+        copy_attachments_to_target_dir(page_changed, attach_dir, output_dir)
+
+        return page_surveys, page_changed, page_hashes
+
+    async def fetch_noaa() -> int:
+        request_count = 0
+        while (batch := await noaa_batches.get()) is not None:
+            timeline.start('NOAA water levels')
+            request_count += await asyncio.to_thread(warm_noaa_data, batch)
+            timeline.end('NOAA water levels')
+
+        journal.completed('noaa')
+        return request_count
+
+    async def finish_copies() -> str:
+        if copies_done:
+            return 'attachments already copied.'
+
+        await asyncio.to_thread(copy_beach_images_to, os.path.join(output_dir, 'to_beach_album'))
+        report = await asyncio.to_thread(copy_report)
+        timeline.add('copy attachments', copy_intervals())
+
+        journal.completed('copies')
+        return report
+
+    noaa_requests = asyncio.create_task(fetch_noaa())
+
+    # pages are fetched ahead on a background thread (see utils.kobo_source)
+    pages = export_pages(export_source, kelp_columns)
+    while (page := await asyncio.to_thread(timed_next, pages, timeline)) is not None:
+        page_surveys, page_changed, page_hashes = await asyncio.to_thread(extract_and_copy, page)
+
+        known_rows.update(known_gis_rows(manifest, journal, page_hashes))
+        await noaa_batches.put({cty: [s for s in ss if s.uuid not in known_rows] for cty, ss in page_changed.items()})
+
+        hashes.update(page_hashes)
+        merge_surveys(surveys_by_county, page_surveys)
+        merge_surveys(changed_by_county, page_changed)
+    await noaa_batches.put(None)
+
+    print('\tfetching NOAA water levels.')
+    report, request_count = await asyncio.gather(finish_copies(), noaa_requests)
+    print('\t\t' + report)
+    print('\t\t{} of {} submissions new or changed.'.format(
+        sum(len(ss) for ss in changed_by_county.values()), len(hashes)))
+    print('\t\t{} water level requests, {}'.format(request_count, naf.in_flight.stats()))
+
+    surveys_by_county = sorted_surveys(surveys_by_county)
+    changed_by_county = sorted_surveys(changed_by_county)
+    unknown_by_county = {cty: [s for s in ss if s.uuid not in known_rows] for cty, ss in changed_by_county.items()}
+    known_rows.update(journaled_gis_rows(unknown_by_county, journal, hashes))
+
+    return surveys_by_county, hashes, known_rows
+
+
+def timed_next(pages, timeline: StageTimeline) -> DataFrame:
+    with timeline.stage('read export'):
+        return next(pages, None)
+
+
+def process_counties_in_pool(data_year: int, export_source: str, start_date: str, attach_dir: str, output_dir: str,
+                             existing_output: bool, copy_mode: str, manifest: dict, journal: rj.RunJournal) -> tuple:
+    """As process_counties, with each county's work in a county_workers process, merged in county order."""
+    reported_columns = set()
+    pages = [submitted_since(clean_export(page, kelp_columns, data_year, reported_columns), start_date, manifest)
+             for page in export_pages(export_source, kelp_columns)]
+    df = pd.concat(pages, ignore_index=True)
+    hashes = submission_hashes(df, start_date, manifest)
+    known_rows = known_gis_rows(manifest, journal, hashes)
+
+    # the attachment index is saved before the workers load it
+    init_attachment_files(attach_dir)
+
+    copy_files = 'copies' not in journal.stages
+    jobs = dict()
+    unchanged_count = 0
+    for cty, county_df in df.groupby('data_county'):
+        uuids = county_df["_uuid"].tolist()
+        unchanged = {uuid for uuid in uuids if rm.is_unchanged(manifest, uuid, hashes[uuid])}
+        unchanged_count += len(unchanged)
+        known = {uuid: known_rows[uuid] for uuid in uuids if uuid in known_rows}
+        jobs[cty] = (cty, county_df, attach_dir, output_dir, existing_output, copy_mode, unchanged, known, copy_files)
+
+    def county_done(cty: str, result: tuple):
+        surveys, new_rows = result
+        journal.record_gis([s for s in surveys if s.uuid in new_rows], list(new_rows.values()), hashes)
+
+    results = cp.run_counties(process_county, jobs, rt_args.county_workers, county_done)
+    merge_worker_copies()
+    journal.completed('copies')
+    journal.completed('noaa')
+
+    surveys_by_county = {cty: surveys for cty, (surveys, _) in results.items()}
+    for _, new_rows in results.values():
+        known_rows.update(new_rows)
+    print('\t\t{} of {} submissions new or changed.'.format(len(hashes) - unchanged_count, len(hashes)))
+
+    return surveys_by_county, hashes, known_rows
+
+
+def process_county(cty: str, df: DataFrame, attach_dir: str, output_dir: str, existing_output: bool, copy_mode: str,
+                   unchanged: set, known_rows: dict, copy_files: bool = True) -> tuple:
+    """
+    One county's surveys, and GIS rows for those not in known_rows, in a county_workers process.  Attachments are
+    not copied again when copy_files is False (a resumed run that had finished its copies).
+    """
+    create_target_directories([cty], output_dir, existing_output)
+    forget_copied_files(copy_mode, output_dir, worker=cty, copy_files=copy_files)
+
+    surveys = extract_rows(df)
+    changed = {cty: [s for s in surveys if s.uuid not in unchanged]}
+    copy_attachments_to_target_dir(changed, attach_dir, output_dir)
+    if copy_files:
+        copy_beach_images_to(os.path.join(output_dir, 'to_beach_album'))
+        print('\t\t{}: {}'.format(cty, copy_report()))
+    else:
+        print('\t\t{}: attachments already copied.'.format(cty))
+
+    unknown = {cty: [s for s in changed[cty] if s.uuid not in known_rows]}
+    warm_noaa_data(unknown)
+    new_rows = dict(zip((s.uuid for s in unknown[cty]), gis_rows(unknown[cty])))
+
+    # water levels stay in the worker
+    for s in surveys:
+        s._depth_adjuster = None
+
+    return surveys, new_rows
+
+
+def known_gis_rows(manifest: dict, journal: rj.RunJournal, hashes: dict) -> dict:
+    """Rows known from an earlier run (incremental), or computed before this run was interrupted (resume)."""
+    known_rows = dict()
+    for entries in (manifest, journal.gis):
+        known_rows.update({uuid: GISData(**entry['gis']) for uuid, entry in entries.items()
+                           if rm.is_unchanged(entries, uuid, hashes.get(uuid))})
+
+    return known_rows
+
+
+def journaled_gis_rows(surveys_by_county: dict, journal: rj.RunJournal, hashes: dict) -> dict:
+    """uuid -> GIS row for the surveys, journaled a county at a time."""
+    rows = dict()
+    for cty in surveys_by_county.keys():
+        surveys = surveys_by_county[cty]
+        gis_data = gis_rows(surveys)
+        journal.record_gis(surveys, gis_data, hashes)
+        rows.update((s.uuid, g) for s, g in zip(surveys, gis_data))
+
+    return rows
 
 
 def copy_attachments_to_target_dir(surveys_by_county: dict, attachments_dir: str, target: str):
@@ -54,8 +316,63 @@ def copy_attachments_to_target_dir(surveys_by_county: dict, attachments_dir: str
         for s in surveys_by_county[county]:
             s.copy_files(attachments_dir, target)
 
-    album_dir = os.path.join(target, 'to_beach_album')
-    copy_beach_images_to(album_dir)
+
+def clean_export(df: DataFrame, schema: list, data_year: int, reported_columns: set = None) -> DataFrame:
+    if reported_columns is None: reported_columns = set()
+
+    cleaned = ph.apply_schema(df, schema, data_year)
+    for label in cleaned.attrs['missing_columns']:
+        if label not in reported_columns:
+            print('\t\tcolumn {} missing from the {} export.'.format(label, data_year))
+            reported_columns.add(label)
+
+    return cleaned
+
+
+def submitted_before(df: DataFrame, start_date: str) -> pd.Series:
+    if len(start_date) == 0: return pd.Series(False, index=df.index)
+
+    submitted = pd.to_datetime(df["_submission_time"], errors='coerce')
+    return submitted < pd.Timestamp(start_date)
+
+
+def submitted_since(df: DataFrame, start_date: str, manifest: dict = None) -> DataFrame:
+    """
+    The rows submitted since start_date.  An incremental run also keeps the earlier rows in its manifest, so the
+    output directory is updated rather than replaced by the latest submissions.
+    """
+    if manifest is None: manifest = {}
+
+    return df[~submitted_before(df, start_date) | df["_uuid"].isin(manifest.keys())]
+
+
+def submission_hashes(df: DataFrame, start_date: str, manifest: dict) -> dict:
+    """_uuid -> row hash, as recorded in the manifest for rows submitted before start_date: they count as unchanged."""
+    hashes = rm.row_hashes(df, [spec.name for spec in kelp_columns])
+    earlier = df["_uuid"][submitted_before(df, start_date)].tolist()
+    hashes.update((uuid, manifest[uuid]['hash']) for uuid in earlier if uuid in manifest)
+
+    return hashes
+
+
+def changed_surveys(surveys_by_county: dict, manifest: dict, hashes: dict) -> dict:
+    changed = dict()
+    for cty in surveys_by_county.keys():
+        surveys = [s for s in surveys_by_county[cty] if not rm.is_unchanged(manifest, s.uuid, hashes[s.uuid])]
+        if surveys: changed[cty] = surveys
+
+    return changed
+
+
+def merge_surveys(surveys_by_county: dict, page_surveys: dict):
+    for cty in page_surveys.keys():
+        surveys_by_county.setdefault(cty, []).extend(page_surveys[cty])
+
+
+def sorted_surveys(surveys_by_county: dict) -> dict:
+    # the order extract_rows gives a whole export
+    return {cty: sorted(surveys_by_county[cty], key=operator.attrgetter("location", "survey_date"))
+            for cty in sorted(surveys_by_county.keys())}
 
 
 def extract_surveys_by_county(df: DataFrame) -> dict:
@@ -73,21 +390,22 @@ def select_start_date() -> str:
     if len(candidate) > 0:
         return candidate
 
-    return str(rt_args.default_year) + "-01-01"
+    return ''
 
 
 # https://stackoverflow.com/questions/69998096/how-to-create-multiple-folders-inside-a-directory
-def create_target_directories(c_names, base_dir):
+def create_target_directories(c_names, base_dir, exist_ok: bool = False):
+    # an incremental, resumed or repeated run (see has_copy_manifest) updates an existing output directory
     try:
         sub_dirs = ["data_files", "site_photos", "volunteer_photos"]
         for cty_name in c_names:
             cty_path = os.path.join(base_dir, cty_name)
-            os.makedirs(cty_path)
+            os.makedirs(cty_path, exist_ok=exist_ok)
             for leaf in sub_dirs:
-                os.makedirs(os.path.join(cty_path, leaf))
+                os.makedirs(os.path.join(cty_path, leaf), exist_ok=exist_ok)
 
         album_dir = os.path.join(base_dir, 'to_beach_album')
-        os.makedirs(album_dir)
+        os.makedirs(album_dir, exist_ok=exist_ok)
     except FileExistsError:
         print("Invalid output directory.  Make sure directory does not exist, or is writable")
 
@@ -61,22 +61,22 @@ class AnchoringSurvey:
         prefix = self.file_prefix()
 
         if len(self.photo_1_name) > 0:
-            fh.copy_file_if_exists(prefix, src, dest, self.photo_1_name, '_photo1')
+            fh.copy_file_if_exists(prefix, src, dest, self.photo_1_name, '_photo1', self.uuid)
 
         if len(self.photo_2_name) > 0:
-            fh.copy_file_if_exists(prefix, src, dest, self.photo_2_name, '_photo2')
+            fh.copy_file_if_exists(prefix, src, dest, self.photo_2_name, '_photo2', self.uuid)
 
         if len(self.photo_3_name) > 0:
-            fh.copy_file_if_exists(prefix, src, dest, self.photo_3_name, '_photo3')
+            fh.copy_file_if_exists(prefix, src, dest, self.photo_3_name, '_photo3', self.uuid)
 
         if len(self.photo_4_name) > 0:
-            fh.copy_file_if_exists(prefix, src, dest, self.photo_4_name, '_photo4')
+            fh.copy_file_if_exists(prefix, src, dest, self.photo_4_name, '_photo4', self.uuid)
 
         if len(self.photo_5_name) > 0:
-            fh.copy_file_if_exists(prefix, src, dest, self.photo_5_name, '_photo5')
+            fh.copy_file_if_exists(prefix, src, dest, self.photo_5_name, '_photo5', self.uuid)
 
         if len(self.photo_6_name) > 0:
-            fh.copy_file_if_exists(prefix, src, dest, self.photo_6_name, '_photo6')
+            fh.copy_file_if_exists(prefix, src, dest, self.photo_6_name, '_photo6', self.uuid)
 
 
 def row_to_survey(sr: Series) -> AnchoringSurvey:
@@ -117,7 +117,73 @@ def row_to_survey(sr: Series) -> AnchoringSurvey:
     return survey_data
 
 
+# every column the anchoring survey model reads
+anchor_columns = [ph.ColumnSpec('observer_names', 'raw'),
+                  ph.ColumnSpec('survey_date', 'raw'),
+                  ph.ColumnSpec('survey_start_time', 'raw'),
+                  ph.ColumnSpec('weather', 'raw'),
+                  ph.ColumnSpec('other_weather_details', 'raw'),
+                  ph.ColumnSpec('data_county', 'raw'),
+                  ph.ColumnSpec('eelgrass_bed_name', 'raw'),
+                  ph.ColumnSpec('eelgrass_bed_label_val', 'raw'),
+                  ph.ColumnSpec('start_tidal_height_ft', 'raw'),
+                  ph.ColumnSpec('camera', 'raw'),
+                  ph.ColumnSpec('other_camera_details', 'raw'),
+                  ph.ColumnSpec('has_buoy', 'raw'),
+                  ph.ColumnSpec('_uuid', 'raw'),
+                  ph.ColumnSpec('_submission_time', 'raw'),
+                  ph.ColumnSpec('_index', 'raw'),
+                  ph.ColumnSpec('other_notes'),
+                  ph.ColumnSpec('without_buoy_count', 'float', 0.0),
+                  ph.ColumnSpec('inside_buoys_count', 'float', 0.0),
+                  ph.ColumnSpec('outside_buoys_count', 'float', 0.0),
+                  ph.ColumnSpec('site_photo_1'),
+                  ph.ColumnSpec('site_photo_2'),
+                  ph.ColumnSpec('site_photo_3'),
+                  ph.ColumnSpec('site_photo_4'),
+                  ph.ColumnSpec('site_photo_5'),
+                  ph.ColumnSpec('site_photo_6')]
+
+
 def extract_rows(df: DataFrame) -> list:
-    # https://www.learndatasci.com/solutions/how-iterate-over-rows-pandas/
-    surveys = list(df.apply(row_to_survey, axis=1))
+    surveys = extract_anchoring_surveys(df)
     return sorted(surveys, key=operator.attrgetter("location", "survey_date"))
+
+
+def extract_anchoring_surveys(df: DataFrame) -> list:
+    """Columnar equivalent of applying row_to_survey to every row of the export, cleaned by anchor_columns."""
+    df = ph.apply_schema(df, anchor_columns)
+
+    def counts(label: str) -> list:
+        return [int(c) for c in df[label].tolist()]
+
+    # date column format changed in 2023.
+    survey_dates = [str(d.date()) if len(str(d)) > 10 else d for d in df.survey_date.tolist()]
+
+    columns = [df.observer_names.tolist(),
+               survey_dates,
+               df.survey_start_time.tolist(),
+               df.weather.tolist(),
+               df.other_weather_details.tolist(),
+               df.data_county.tolist(),
+               df.eelgrass_bed_name.tolist(),
+               df.eelgrass_bed_label_val.tolist(),
+               df.start_tidal_height_ft.tolist(),
+               df.camera.tolist(),
+               df.other_camera_details.tolist(),
+               df.other_notes.tolist(),
+               df.has_buoy.tolist(),
+               counts('without_buoy_count'),
+               counts('inside_buoys_count'),
+               counts('outside_buoys_count'),
+               df.site_photo_1.tolist(),
+               df.site_photo_2.tolist(),
+               df.site_photo_3.tolist(),
+               df.site_photo_4.tolist(),
+               df.site_photo_5.tolist(),
+               df.site_photo_6.tolist(),
+               df["_uuid"].tolist(),
+               df["_submission_time"].tolist(),
+               df["_index"].tolist()]
+
+    return [AnchoringSurvey(*values) for values in zip(*columns)]
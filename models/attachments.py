@@ -1,13 +1,13 @@
 from dataclasses import dataclass
 
-from pandas import Series
+from pandas import DataFrame, Series
 
 from utils.files_helper import copy_file_if_exists
 
 import utils.pandas_helper as ph
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class DataSetAttachments:
     data_sheet_1: str
     data_sheet_2: str
@@ -18,23 +18,23 @@ class DataSetAttachments:
     spreadsheet_1: str
     spreadsheet_2: str
 
-    def copy_files(self, file_prefix: str, src: str, dest: str):
+    def copy_files(self, file_prefix: str, src: str, dest: str, uuid: str = ''):
         if len(self.data_sheet_1) > 0:
-            copy_file_if_exists(file_prefix, src, dest, self.data_sheet_1, '_DataSheet1')
+            copy_file_if_exists(file_prefix, src, dest, self.data_sheet_1, '_DataSheet1', uuid)
         if len(self.data_sheet_2) > 0:
-            copy_file_if_exists(file_prefix, src, dest, self.data_sheet_2, '_DataSheet2')
+            copy_file_if_exists(file_prefix, src, dest, self.data_sheet_2, '_DataSheet2', uuid)
         if len(self.track_gps_file) > 0:
-            copy_file_if_exists(file_prefix, src, dest, self.track_gps_file, '_Gps1')
+            copy_file_if_exists(file_prefix, src, dest, self.track_gps_file, '_Gps1', uuid)
         if len(self.second_gps_file) > 0:
-            copy_file_if_exists(file_prefix, src, dest, self.second_gps_file, '_Gps2')
+            copy_file_if_exists(file_prefix, src, dest, self.second_gps_file, '_Gps2', uuid)
         if len(self.third_gps_file) > 0:
-            copy_file_if_exists(file_prefix, src, dest, self.third_gps_file, '_Gps3')
+            copy_file_if_exists(file_prefix, src, dest, self.third_gps_file, '_Gps3', uuid)
         if len(self.fourth_gps_file) > 0:
-            copy_file_if_exists(file_prefix, src, dest, self.fourth_gps_file, '_Gps4')
+            copy_file_if_exists(file_prefix, src, dest, self.fourth_gps_file, '_Gps4', uuid)
         if len(self.spreadsheet_1) > 0:
-            copy_file_if_exists(file_prefix, src, dest, self.spreadsheet_1, '_SpreadSheet1')
+            copy_file_if_exists(file_prefix, src, dest, self.spreadsheet_1, '_SpreadSheet1', uuid)
         if len(self.spreadsheet_2) > 0:
-            copy_file_if_exists(file_prefix, src, dest, self.spreadsheet_2, '_SpreadSheet2')
+            copy_file_if_exists(file_prefix, src, dest, self.spreadsheet_2, '_SpreadSheet2', uuid)
 
 
 def extract_data_attachments(survey_row: Series) -> DataSetAttachments:
@@ -55,3 +55,35 @@ def extract_data_attachments(survey_row: Series) -> DataSetAttachments:
         ph.as_string_or_default(survey_row.CSV1_data_file),
         ph.as_string_or_default(survey_row.CSV2_data_file)
     )
+
+
+data_attachment_columns = [ph.ColumnSpec('data_sheet_format', 'raw'),
+                           ph.ColumnSpec('data_sheet_pdf_1'),
+                           ph.ColumnSpec('data_sheet_pdf_2'),
+                           ph.ColumnSpec('data_sheet_page_1'),
+                           ph.ColumnSpec('data_sheet_page_2'),
+                           ph.ColumnSpec('Track_data_file'),
+                           ph.ColumnSpec('Second_data_file'),
+                           ph.ColumnSpec('Third_data_file'),
+                           ph.ColumnSpec('Fourth_data_file'),
+                           ph.ColumnSpec('CSV1_data_file'),
+                           ph.ColumnSpec('CSV2_data_file')]
+
+
+def extract_data_attachment_columns(df: DataFrame) -> list:
+    df = ph.apply_schema(df, data_attachment_columns)
+    is_pdf = (df.data_sheet_format == "ds_pdf").tolist()
+
+    def data_sheets(pdf_label: str, page_label: str) -> list:
+        return [p if pdf else g for pdf, p, g in zip(is_pdf, df[pdf_label].tolist(), df[page_label].tolist())]
+
+    columns = [data_sheets('data_sheet_pdf_1', 'data_sheet_page_1'),
+               data_sheets('data_sheet_pdf_2', 'data_sheet_page_2'),
+               df.Track_data_file.tolist(),
+               df.Second_data_file.tolist(),
+               df.Third_data_file.tolist(),
+               df.Fourth_data_file.tolist(),
+               df.CSV1_data_file.tolist(),
+               df.CSV2_data_file.tolist()]
+
+    return [DataSetAttachments(*values) for values in zip(*columns)]
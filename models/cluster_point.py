@@ -1,11 +1,11 @@
 from dataclasses import dataclass
 
-from pandas import Series
+from pandas import DataFrame, Series
 
 import utils.pandas_helper as ph
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class KelpClusterPoint:
     gps_point_name: str
     depth: float
@@ -27,3 +27,26 @@ def extract_kelp_clusters(ds: Series) -> list:
         if len(cluster_info.gps_point_name) > 0: clusters.append(cluster_info)
 
     return clusters
+
+
+kelp_cluster_columns = [spec for i in range(1, 4) for spec in (ph.ColumnSpec("kc_gps_point_name" + str(i)),
+                                                                ph.ColumnSpec("kc_depth" + str(i), 'float'),
+                                                                ph.ColumnSpec("kc_temp" + str(i), 'float'),
+                                                                ph.ColumnSpec("kc_observation" + str(i)))]
+
+
+def extract_kelp_cluster_columns(df: DataFrame) -> list:
+    df = ph.apply_schema(df, kelp_cluster_columns)
+    clusters = [list() for _ in range(len(df))]
+
+    for i in range(1, 4):
+        index_suffix = str(i)
+        columns = zip(df["kc_gps_point_name" + index_suffix].tolist(),
+                      df["kc_depth" + index_suffix].tolist(),
+                      df["kc_temp" + index_suffix].tolist(),
+                      df["kc_observation" + index_suffix].tolist())
+
+        for row_clusters, values in zip(clusters, columns):
+            if len(values[0]) > 0: row_clusters.append(KelpClusterPoint(*values))
+
+    return clusters
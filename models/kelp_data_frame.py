@@ -1,15 +1,19 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
+from operator import attrgetter
 from pathlib import Path
 
+import numpy as np
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import column_index_from_string
 from openpyxl.workbook import Workbook
-from openpyxl.worksheet.worksheet import Worksheet
 
 from pandas import DataFrame
 
 import utils.files_helper as fh
 
 from models.kelp_row import KelpSurvey
+from noaa.mllw_adjuster import adjust_depths
 
 
 @dataclass
@@ -49,8 +53,22 @@ class GISData:
     extent_end_waypoint: str
 
 
-def as_gis_data(ks: KelpSurvey) -> GISData:
-    da = ks.depth_adjuster
+def mllw_columns(surveys: list) -> np.ndarray:
+    """MLLW tidal height and depth columns for all surveys (one row per survey), rounded to centimeters."""
+    measured = np.array([[ks.tidal_ht,
+                          ks.depth_1_at_shore_edge,
+                          ks.depth_1_at_outer_edge,
+                          ks.depth_2_at_shore_edge,
+                          ks.depth_2_at_outer_edge] for ks in surveys], dtype=float).reshape(-1, 5)
+
+    adjusted = adjust_depths([ks.depth_adjuster for ks in surveys], measured)
+    return np.round(adjusted, 2)
+
+
+def as_gis_data(ks: KelpSurvey, mllw: tuple = None) -> GISData:
+    if mllw is None:
+        mllw = tuple(mllw_columns([ks])[0])
+
     return GISData(
         ks.survey_date,
         ks.volunteer_info.lead_name,
@@ -73,14 +91,14 @@ def as_gis_data(ks: KelpSurvey) -> GISData:
         round(ks.tidal_ht, 2),
         ks.tide_station_label,
         ks.file_prefix(),
-        round(da.adjust_depth(ks.tidal_ht), 2),
-        round(da.adjust_depth(ks.depth_1_at_shore_edge), 2),
-        round(da.adjust_depth(ks.depth_1_at_outer_edge), 2),
-        round(da.adjust_depth(ks.depth_2_at_shore_edge), 2),
-        round(da.adjust_depth(ks.depth_2_at_outer_edge), 2),
+        float(mllw[0]),
+        float(mllw[1]),
+        float(mllw[2]),
+        float(mllw[3]),
+        float(mllw[4]),
         'no image available',
         ks.survey_conditions,
-        file_hyperlink(ks.site_image_names.to_beach),
+        file_hyperlink(ks.site_image_names.to_beach, ks.uuid),
         round(ks.current_knots, 1),
         ks.current_station,
         ks.extent_start_waypoint,
@@ -125,10 +143,10 @@ def row_header_labels() -> list:
             ]
 
 
-def file_hyperlink(fn: str) -> str:
+def file_hyperlink(fn: str, uuid: str) -> str:
     if len(fn) == 0:
         return ''
-    file_path = fh.find_attachment_path(fn)
+    file_path = fh.find_attachment_path(fn, uuid)
     label = Path(file_path).name
 
     return path_to_link(file_path, label)
@@ -141,31 +159,27 @@ def path_to_link(path, label):
 
 # https://www.kdnuggets.com/2022/08/3-ways-append-rows-pandas-dataframes.html
 # https://groups.google.com/g/openpyxl-users/c/1auXBiDlzHk?pli=1 (final comment)
-def create_gis_excel_workbook(surveys: dict, dest: str, year: int):
-    gis_data = []
-    for cty in surveys.keys():
-        for ks in surveys[cty]:
-            gis_data.append(as_gis_data(ks))
+def create_gis_excel_workbook(surveys: dict, dest: str, year: int, known_rows: dict = None) -> list:
+    """Writes the worksheet, returning its rows.  known_rows (uuid -> GISData) are used instead of recomputing."""
+    all_surveys = [ks for cty in surveys.keys() for ks in surveys[cty]]
+    gis_data = gis_rows(all_surveys, known_rows)
 
-    df = DataFrame(gis_data)
+    fn = 'gisWorksheet' + str(year) + '.xlsx'
+    destination = str(os.path.join(dest, fn))
+    print('\t\twriting ', destination)
 
-    from openpyxl.utils.dataframe import dataframe_to_rows
-    wb = Workbook()
-    ws = wb.active
+    write_gis_worksheet(gis_data, destination)
+    return gis_data
 
-    for r in dataframe_to_rows(df, index=False, header=True):
-        ws.append(r)
 
-    set_column_labels(ws)
+def gis_rows(surveys: list, known_rows: dict = None) -> list:
+    if known_rows is None: known_rows = {}
 
-    number_cols = ['D', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'S', 'V', 'W', 'X', 'Y', 'Z', 'AD', 'AF', 'AG']
-    set_number_formats(ws, number_cols, '0.00')
+    new_surveys = [ks for ks in surveys if ks.uuid not in known_rows]
+    mllw = mllw_columns(new_surveys)
+    new_rows = {ks.uuid: as_gis_data(ks, tuple(m)) for ks, m in zip(new_surveys, mllw)}
 
-    fn = 'gisWorksheet' + str(year) + '.xlsx'
-    destination = str(os.path.join(dest, fn))
-    print('\t\twriting ', destination)
-
-    wb.save(destination)
+    return [known_rows[ks.uuid] if ks.uuid in known_rows else new_rows[ks.uuid] for ks in surveys]
 
 
 # See 'Converting worksheet to a Dataframe' on https://openpyxl.readthedocs.io/en/stable/pandas.html
@@ -180,13 +194,28 @@ def as_data_frame(sheet) -> DataFrame:
     return DataFrame(data, index=idx, columns=cols)
 
 
-def set_number_formats(sheet: Worksheet, cell_letters: list, fmt: str):
-    for c in cell_letters:
-        for i in range(1, sheet.max_row):
-            sheet[c + str(i)].number_format = fmt
+# Columns formatted as numbers with two decimals (depths, temperatures, distances)
+number_columns = ['D', 'I', 'J', 'K', 'L', 'M', 'N', 'O', 'P', 'S', 'V', 'W', 'X', 'Y', 'Z', 'AD', 'AF', 'AG']
+
 
+def write_gis_worksheet(gis_data: list, destination: str):
+    """
+    Streams the rows into a write-only workbook, formatting each number cell as it is created, so archive-sized
+    worksheets are written without holding every cell in memory.
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(row_header_labels())
 
-def set_column_labels(sheet: Worksheet):
-    labels = row_header_labels()
-    for i in range(1, sheet.max_column):
-        sheet.cell(1, i).value = labels[i - 1]
+    number_indexes = {column_index_from_string(c) - 1 for c in number_columns}
+    row_values = attrgetter(*(f.name for f in fields(GISData)))
+
+    def number_cell(value) -> WriteOnlyCell:
+        cell = WriteOnlyCell(ws, value=value)
+        cell.number_format = '0.00'
+        return cell
+
+    for g in gis_data:
+        ws.append([number_cell(v) if i in number_indexes else v for i, v in enumerate(row_values(g))])
+
+    wb.save(destination)
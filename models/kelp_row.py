@@ -3,6 +3,7 @@ from dataclasses import dataclass
 import operator
 from datetime import date, time
 
+import numpy as np
 from pandas import DataFrame, Series
 
 import models.site_images as SurveySiteImages
@@ -17,7 +18,8 @@ import noaa.mllw_adjuster as MllwDepthAdjuster
 from models.tidal_station import lookup_station
 
 
-@dataclass()
+# slotted, like the attachment records: archive-wide runs keep every survey in memory (see models/survey_table.py)
+@dataclass(slots=True)
 class KelpSurvey:
     """Class with key columns from the KoboToolbox export of Kelp surveys"""
     survey_date: str
@@ -77,13 +79,13 @@ class KelpSurvey:
 
     def copy_files(self, src: str, dest: str) -> bool:
         pics_dir = os.path.join(dest, self.county, "site_photos")
-        self.site_image_names.copy_files(self.file_prefix(), src, pics_dir)
+        self.site_image_names.copy_files(self.file_prefix(), src, pics_dir, self.uuid)
 
         data_pics_dir = os.path.join(dest, self.county, "data_files")
-        self.data_file_names.copy_files(self.file_prefix(), src, data_pics_dir)
+        self.data_file_names.copy_files(self.file_prefix(), src, data_pics_dir, self.uuid)
 
         volunteer_dir = os.path.join(dest, self.county, "volunteer_photos")
-        self.volunteer_info.copy_files(self.file_prefix(), src, volunteer_dir)
+        self.volunteer_info.copy_files(self.file_prefix(), src, volunteer_dir, self.uuid)
 
 
 def celsius_temp(t: float, t_units: str) -> float:
@@ -97,11 +99,105 @@ def metric_depth(ft: float) -> float:
 
 
 def extract_rows(df: DataFrame) -> list:
-    # https://www.learndatasci.com/solutions/how-iterate-over-rows-pandas/
-    surveys = list(df.apply(row_to_kelp_survey, axis=1))
+    surveys = extract_kelp_surveys(df)
     return sorted(surveys, key=operator.attrgetter("location", "survey_date"))
 
 
+survey_columns = [ph.ColumnSpec("survey_date", 'raw'),
+                  ph.ColumnSpec("kelp_bed_name", 'raw'),
+                  ph.ColumnSpec("_index", 'raw'),
+                  ph.ColumnSpec("data_county", 'raw'),
+                  ph.ColumnSpec("weather", 'raw'),
+                  ph.ColumnSpec("tide_stn_label", 'raw'),
+                  ph.ColumnSpec("tide_stn_name", 'raw'),
+                  ph.ColumnSpec("observations", 'raw'),
+                  ph.ColumnSpec("_uuid", 'raw'),
+                  ph.ColumnSpec("_submission_time", 'raw'),
+                  ph.ColumnSpec("Temperature_Units", default="fahrenheit"),
+                  ph.ColumnSpec("start_tidal_height_ft", 'float'),
+                  ph.ColumnSpec("survey_start_time"),
+                  ph.ColumnSpec("end_time"),
+                  ph.ColumnSpec("other_notes"),
+                  ph.ColumnSpec("closest_edge_depth1", 'float'),
+                  ph.ColumnSpec("closest_edge_temp1", 'float'),
+                  ph.ColumnSpec("farthest_edge_depth1", 'float'),
+                  ph.ColumnSpec("farthest_edge_temp1", 'float'),
+                  ph.ColumnSpec("closest_edge_depth2", 'float'),
+                  ph.ColumnSpec("closest_edge_temp2", 'float'),
+                  ph.ColumnSpec("farthest_edge_depth2", 'float'),
+                  ph.ColumnSpec("farthest_edge_temp2", 'float'),
+                  ph.ColumnSpec("kc_observation4"),
+                  ph.ColumnSpec("GPS_perimeter_track_name"),
+                  ph.ColumnSpec("current_in_knots", 'float'),
+                  ph.ColumnSpec("tide_station_source"),
+                  ph.ColumnSpec("survey_conditions", 'raw'),
+                  ph.ColumnSpec("extent_start_waypoint", 'raw'),
+                  ph.ColumnSpec("extent_end_waypoint", 'raw')]
+
+# every column the kelp survey models read, applied once to the whole export by kelp.py
+kelp_columns = (survey_columns +
+                SurveySiteImages.site_image_columns +
+                DataSetAttachments.data_attachment_columns +
+                VolunteerInfo.volunteer_info_columns +
+                KelpClusterPoint.kelp_cluster_columns)
+
+
+def extract_kelp_surveys(df: DataFrame) -> list:
+    """
+    Columnar equivalent of applying row_to_kelp_survey to every row: the export is cleaned by kelp_columns (a no-op
+    when kelp.py already did), units are converted a column at a time, and the surveys are built from plain lists.
+    """
+    df = ph.apply_schema(df, kelp_columns)
+    is_fahrenheit = [u == "fahrenheit" for u in df["Temperature_Units"].tolist()]
+
+    def metric_depths(label: str) -> list:
+        return (np.array(df[label].tolist(), dtype=float) * 0.3048).tolist()
+
+    def celsius_temps(label: str) -> list:
+        return [(t - 32.0) / 1.8 if f else t for t, f in zip(df[label].tolist(), is_fahrenheit)]
+
+    stations = {stn: lookup_station(int(stn)) for stn in df.tide_stn_name.unique()}
+
+    columns = [df.survey_date.dt.strftime('%Y-%m-%d').tolist(),
+               df.kelp_bed_name.tolist(),
+               df["_index"].tolist(),
+               df.data_county.tolist(),
+               df.weather.tolist(),
+               metric_depths("start_tidal_height_ft"),
+               df.tide_stn_label.tolist(),
+               [stations[stn] for stn in df.tide_stn_name.tolist()],
+               df.survey_start_time.tolist(),
+               df.end_time.tolist(),
+               df.observations.tolist(),
+               df.other_notes.tolist(),
+               metric_depths("closest_edge_depth1"),
+               celsius_temps("closest_edge_temp1"),
+               metric_depths("farthest_edge_depth1"),
+               celsius_temps("farthest_edge_temp1"),
+               metric_depths("closest_edge_depth2"),
+               celsius_temps("closest_edge_temp2"),
+               metric_depths("farthest_edge_depth2"),
+               celsius_temps("farthest_edge_temp2"),
+               df.kc_observation1.tolist(),
+               df.kc_observation2.tolist(),
+               df.kc_observation3.tolist(),
+               df.kc_observation4.tolist(),
+               df["_uuid"].tolist(),
+               [str(t) for t in df["_submission_time"].tolist()],
+               df.GPS_perimeter_track_name.tolist(),
+               SurveySiteImages.extract_site_image_columns(df),
+               DataSetAttachments.extract_data_attachment_columns(df),
+               VolunteerInfo.extract_volunteer_info_columns(df),
+               KelpClusterPoint.extract_kelp_cluster_columns(df),
+               df.current_in_knots.tolist(),
+               df.tide_station_source.tolist(),
+               df.survey_conditions.tolist(),
+               df.extent_start_waypoint.tolist(),
+               df.extent_end_waypoint.tolist()]
+
+    return [KelpSurvey(*values) for values in zip(*columns)]
+
+
 def row_to_kelp_survey(sr: Series) -> KelpSurvey:
     temp_units = ph.as_string_or_default(sr["Temperature_Units"], "fahrenheit")
     survey_date_str = str(sr.survey_date.date())
@@ -1,11 +1,11 @@
 from dataclasses import dataclass
 
-from pandas import Series
+from pandas import DataFrame, Series
 
 import utils.files_helper as fh
 import utils.pandas_helper as ph
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SurveySiteImages:
     beach_to_the_left: str      # 2022 only
     beach_to_the_right: str     # 2022 only
@@ -16,23 +16,23 @@ class SurveySiteImages:
     kelp_photo_3: str           # 2023 and later
     kelp_photo_4: str           # 2023 and later
 
-    def copy_files(self, file_prefix: str, src: str, dest: str):
+    def copy_files(self, file_prefix: str, src: str, dest: str, uuid: str = ''):
         if len(self.beach_to_the_left) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.beach_to_the_left, '_BeL')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.beach_to_the_left, '_BeL', uuid)
         if len(self.beach_to_the_right) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.beach_to_the_right, '_BeR')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.beach_to_the_right, '_BeR', uuid)
         if len(self.to_beach) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.to_beach, '_ToBe')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.to_beach, '_ToBe', uuid)
         if len(self.to_water) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.to_water, '_ToWa')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.to_water, '_ToWa', uuid)
         if len(self.kelp_photo_1) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.kelp_photo_1, '_Kelp1')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.kelp_photo_1, '_Kelp1', uuid)
         if len(self.kelp_photo_2) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.kelp_photo_2, '_Kelp2')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.kelp_photo_2, '_Kelp2', uuid)
         if len(self.kelp_photo_3) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.kelp_photo_3, '_Kelp3')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.kelp_photo_3, '_Kelp3', uuid)
         if len(self.kelp_photo_4) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.kelp_photo_4, '_Kelp4')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.kelp_photo_4, '_Kelp4', uuid)
 
 
 def extract_site_image_attachments(survey_row: Series) -> SurveySiteImages:
@@ -53,3 +53,21 @@ def extract_site_image_attachments(survey_row: Series) -> SurveySiteImages:
         get_value_for_key('kelp_photo_3'),
         get_value_for_key('kelp_photo_4')
     )
+
+
+site_image_columns = [ph.ColumnSpec('beach_to_the_left_photo', last_year=2022),
+                      ph.ColumnSpec('beach_to_the_right_photo', last_year=2022),
+                      ph.ColumnSpec('to_beach_photo'),
+                      ph.ColumnSpec('to_water_photo', last_year=2022),
+                      ph.ColumnSpec('kelp_photo_1', first_year=2023),
+                      ph.ColumnSpec('kelp_photo_2', first_year=2023),
+                      ph.ColumnSpec('kelp_photo_3', first_year=2023),
+                      ph.ColumnSpec('kelp_photo_4', first_year=2023)]
+
+
+def extract_site_image_columns(df: DataFrame) -> list:
+    # columns missing from a year's export (see above) are all ''
+    df = ph.apply_schema(df, site_image_columns)
+    columns = [df[spec.name].tolist() for spec in site_image_columns]
+
+    return [SurveySiteImages(*values) for values in zip(*columns)]
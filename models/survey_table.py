@@ -0,0 +1,122 @@
+from dataclasses import fields
+from math import isnan
+
+import numpy as np
+
+from models.attachments import DataSetAttachments
+from models.cluster_point import KelpClusterPoint
+from models.kelp_row import KelpSurvey
+from models.site_images import SurveySiteImages
+from models.volunteer_info import VolunteerInfo
+
+# Struct-of-arrays storage for a whole archive of kelp surveys.  Numbers are NumPy columns, and strings (mostly
+# empty or repeated attachment, station and county names) are int32 indexes into a StringTable shared by every
+# table, so each distinct string is stored once.  Surveys are rebuilt on demand with survey() or surveys().
+record_fields = {'site_image_names': SurveySiteImages,
+                 'data_file_names': DataSetAttachments,
+                 'volunteer_info': VolunteerInfo}
+
+float_fields = [f.name for f in fields(KelpSurvey) if f.type is float]
+int_fields = [f.name for f in fields(KelpSurvey) if f.type is int]
+string_fields = [f.name for f in fields(KelpSurvey) if f.type is str]
+
+
+class StringTable:
+    """Each distinct string once, by index.  Index -1 is a missing (NaN) value."""
+    def __init__(self):
+        self.strings = []
+        self.indexes = {}
+
+    def index_of(self, s) -> int:
+        if isinstance(s, float) and isnan(s):
+            return -1
+
+        i = self.indexes.get(s)
+        if i is None:
+            i = len(self.strings)
+            self.indexes[s] = i
+            self.strings.append(s)
+
+        return i
+
+    def column(self, values: list) -> np.ndarray:
+        return np.fromiter((self.index_of(v) for v in values), dtype=np.int32, count=len(values))
+
+    def values(self, column: np.ndarray) -> list:
+        return [float('NaN') if i < 0 else self.strings[i] for i in column.tolist()]
+
+
+class SurveyTable:
+    def __init__(self, surveys: list, strings: StringTable = None):
+        self.strings = StringTable() if strings is None else strings
+        self.count = len(surveys)
+        self.columns = {}
+
+        for name in float_fields:
+            self.columns[name] = np.array([getattr(s, name) for s in surveys], dtype=np.float64)
+        for name in int_fields:
+            self.columns[name] = np.array([getattr(s, name) for s in surveys], dtype=np.int64)
+        for name in string_fields:
+            self.columns[name] = self.strings.column([getattr(s, name) for s in surveys])
+
+        for name, record_type in record_fields.items():
+            for f in fields(record_type):
+                self.columns[name + '.' + f.name] = self.strings.column([getattr(getattr(s, name), f.name)
+                                                                         for s in surveys])
+
+        # surveys share a handful of TidalStation objects
+        self.stations = []
+        station_indexes = {}
+        for s in surveys:
+            if id(s.tide_station) not in station_indexes:
+                station_indexes[id(s.tide_station)] = len(self.stations)
+                self.stations.append(s.tide_station)
+        self.columns['tide_station'] = np.array([station_indexes[id(s.tide_station)] for s in surveys], dtype=np.int32)
+
+        # clusters of survey i are rows cluster_offsets[i] to cluster_offsets[i + 1] of the cluster columns
+        clusters = [c for s in surveys for c in s.kelp_clusters]
+        self.cluster_offsets = np.cumsum([0] + [len(s.kelp_clusters) for s in surveys], dtype=np.int64)
+        self.cluster_columns = {'gps_point_name': self.strings.column([c.gps_point_name for c in clusters]),
+                                'depth': np.array([c.depth for c in clusters], dtype=np.float64),
+                                'water_temp': np.array([c.water_temp for c in clusters], dtype=np.float64),
+                                'observations': self.strings.column([c.observations for c in clusters])}
+
+    def __len__(self) -> int:
+        return self.count
+
+    def survey(self, i: int) -> KelpSurvey:
+        return self.surveys(slice(i, i + 1))[0]
+
+    def surveys(self, rows: slice = slice(None)) -> list:
+        """The surveys in a contiguous slice of the table (all of them by default)."""
+        def column_values(name: str) -> list:
+            column = self.columns[name][rows]
+            return self.strings.values(column) if column.dtype == np.int32 else column.tolist()
+
+        values = {name: column_values(name) for name in float_fields + int_fields + string_fields}
+        values['tide_station'] = [self.stations[i] for i in self.columns['tide_station'][rows].tolist()]
+
+        for name, record_type in record_fields.items():
+            record_columns = [column_values(name + '.' + f.name) for f in fields(record_type)]
+            values[name] = [record_type(*record) for record in zip(*record_columns)]
+
+        row_ids = range(self.count)[rows]
+        offsets = self.cluster_offsets.tolist()
+        first = offsets[row_ids[0]] if row_ids else 0
+        last = offsets[row_ids[-1] + 1] if row_ids else 0
+
+        def cluster_values(name: str) -> list:
+            column = self.cluster_columns[name][first:last]
+            return self.strings.values(column) if column.dtype == np.int32 else column.tolist()
+
+        clusters = [KelpClusterPoint(*c) for c in zip(cluster_values('gps_point_name'), cluster_values('depth'),
+                                                       cluster_values('water_temp'), cluster_values('observations'))]
+        values['kelp_clusters'] = [clusters[offsets[i] - first:offsets[i + 1] - first] for i in row_ids]
+
+        names = [f.name for f in fields(KelpSurvey) if f.name in values]
+        return [KelpSurvey(**dict(zip(names, row))) for row in zip(*(values[n] for n in names))]
+
+    def nbytes(self) -> int:
+        """Bytes held by the arrays (the shared string table not included)."""
+        arrays = list(self.columns.values()) + list(self.cluster_columns.values()) + [self.cluster_offsets]
+        return sum(a.nbytes for a in arrays)
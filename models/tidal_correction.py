@@ -50,6 +50,10 @@ class TidalCorrection:
 # }
 def fetch_tidal_correction(a_station_id: int) -> TidalCorrection:
     reply = naf.fetch_tide_offsets_reply(a_station_id)
+    if 'type' not in reply:
+        print("fetch_tidal_correction found no offsets for station id: {}".format(a_station_id))
+        return TidalCorrection(0, 0, 0, 1.0, 0.0)  # unknown correction
+
     t_offset = reply['timeOffsetLowTide']
     ref_station = reply['refStationId'].strip()
     if len(ref_station) == 0: ref_station = str(a_station_id)
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 
 import noaa.api_fetcher as naf
+import noaa.station_index as si
 import models.tidal_correction as tc
 
 from models.tidal_correction import TidalCorrection
@@ -14,6 +15,7 @@ class TidalStation:
 
     @property
     def tidal_correction(self) -> TidalCorrection:
+        # concurrent first accesses share one tidepredoffsets request (see noaa.api_fetcher.in_flight)
         if self._tidal_correction.is_unknown():
             self._tidal_correction = tc.fetch_tidal_correction(self.id)
 
@@ -40,17 +42,35 @@ known_stations = {9447905: TidalStation("Admiralty Head", 9447905),
                   }
 
 
-def lookup_station(station_id: int) -> TidalStation:
+def lookup_station(station_id: int, lat_lng: tuple = None) -> TidalStation:
+    """
+    Station for the id, from known_stations, then the local station index, then NOAA.  When the id is not a NOAA
+    station and a (latitude, longitude) is given, the nearest tide station is used instead.
+    """
     if station_id in known_stations: return known_stations[station_id]
 
+    info = si.station_index().station_info(station_id)
+    if info is not None:
+        return known_stations.setdefault(station_id, TidalStation(info.name, station_id))
+
+    if lat_lng is not None:
+        return nearest_tide_station(lat_lng[0], lat_lng[1])
+
     reply = naf.fetch_station_info(station_id)
 
     if 'stations' in reply:
         noaa_station_info = dict(reply['stations'][0])
         new_id = int(noaa_station_info['id'])
-        new_station = TidalStation(noaa_station_info['name'], new_id)
-        known_stations[new_id] = new_station
-
-        return new_station
+        # setdefault, so concurrent lookups of the same station all share one TidalStation
+        return known_stations.setdefault(new_id, TidalStation(noaa_station_info['name'], new_id))
 
     raise Exception('Failed to find NOAA station: {}'.format(station_id))
+
+
+def nearest_tide_station(lat: float, lng: float) -> TidalStation:
+    info = si.station_index().nearest(lat, lng)
+    if info is None:
+        raise Exception('No NOAA tide station near: {}, {}'.format(lat, lng))
+
+    stn_id = int(info.id)
+    return known_stations.setdefault(stn_id, TidalStation(info.name, stn_id))
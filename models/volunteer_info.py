@@ -1,12 +1,12 @@
 from dataclasses import dataclass
 
-from pandas import Series
+from pandas import DataFrame, Series
 
 import utils.files_helper as fh
 import utils.pandas_helper as ph
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class VolunteerInfo:
     lead_name: str
     names: str
@@ -15,15 +15,15 @@ class VolunteerInfo:
     image_file_3: str
     image_file_4: str
 
-    def copy_files(self, file_prefix: str, src: str, dest: str):
+    def copy_files(self, file_prefix: str, src: str, dest: str, uuid: str = ''):
         if len(self.image_file_1) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.image_file_1, '_volunteer1')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.image_file_1, '_volunteer1', uuid)
         if len(self.image_file_2) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.image_file_2, '_volunteer2')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.image_file_2, '_volunteer2', uuid)
         if len(self.image_file_3) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.image_file_3, '_volunteer3')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.image_file_3, '_volunteer3', uuid)
         if len(self.image_file_4) > 0:
-            fh.copy_file_if_exists(file_prefix, src, dest, self.image_file_4, '_volunteer4')
+            fh.copy_file_if_exists(file_prefix, src, dest, self.image_file_4, '_volunteer4', uuid)
 
 
 def extract_volunteer_info(ds: Series) -> VolunteerInfo:
@@ -35,3 +35,18 @@ def extract_volunteer_info(ds: Series) -> VolunteerInfo:
         ph.as_string_or_default(ds.volunteer_photo_3),
         ph.as_string_or_default(ds.volunteer_photo_4)
     )
+
+
+volunteer_info_columns = [ph.ColumnSpec('team_leader'),
+                          ph.ColumnSpec('name_of_surveyors'),
+                          ph.ColumnSpec('volunteer_photo_1'),
+                          ph.ColumnSpec('volunteer_photo_2'),
+                          ph.ColumnSpec('volunteer_photo_3'),
+                          ph.ColumnSpec('volunteer_photo_4')]
+
+
+def extract_volunteer_info_columns(df: DataFrame) -> list:
+    df = ph.apply_schema(df, volunteer_info_columns)
+    columns = [df[spec.name].tolist() for spec in volunteer_info_columns]
+
+    return [VolunteerInfo(*values) for values in zip(*columns)]
@@ -2,6 +2,13 @@ from datetime import datetime
 
 import requests
 from requests import Response
+from requests.adapters import HTTPAdapter
+
+import noaa.reply_cache as rc
+from noaa.single_flight import SingleFlight
+import runtime_args as rt_args
+import utils.http_cassette as hc
+from utils.rate_limiter import HostRateLimiter
 
 
 # Useful links regarding NOAA api
@@ -15,6 +22,23 @@ from requests import Response
 #   endDate = "20210810 13:45"
 # For details, see: https://api.tidesandcurrents.noaa.gov/api/prod#DataAPIResponse
 
+# One pooled session (keep-alive connections) shared by every thread, with a per-host request rate limit
+session = requests.Session()
+session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=rt_args.noaa_workers))
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=rt_args.noaa_workers))
+hc.install(session)
+
+rate_limiter = HostRateLimiter(rt_args.noaa_requests_per_second)
+
+# identical lookups made concurrently (same station, product and window) share one request
+in_flight = SingleFlight()
+
+
+def get(url: str, params: dict = None) -> Response:
+    rate_limiter.wait(url)
+    return session.get(url, params=params, timeout=rt_args.noaa_timeout_secs)
+
+
 def process_reply(r: Response) -> dict:
     if (r.status_code != 200):
         print("Query failed due to: {}", r.reason)
@@ -22,8 +46,17 @@ def process_reply(r: Response) -> dict:
 
     return dict(r.json())
 
+# All fetch_* functions read the local reply cache first (see noaa/reply_cache.py)
 def fetch_water_data_reply(station_id: int, begin_date: datetime, end_date: datetime,
                            product: str = 'one_minute_water_level') -> dict:
+    def fetch() -> dict:
+        return request_water_data_reply(station_id, begin_date, end_date, product)
+
+    key = (station_id, product, begin_date, end_date)
+    return in_flight.do(key, lambda: rc.cached_reply(station_id, product, fetch, begin_date, end_date))
+
+
+def request_water_data_reply(station_id: int, begin_date: datetime, end_date: datetime, product: str) -> dict:
     start_str = begin_date.strftime('%Y%m%d %H:%M')
     end_str = end_date.strftime('%Y%m%d %H:%M')
 
@@ -31,19 +64,61 @@ def fetch_water_data_reply(station_id: int, begin_date: datetime, end_date: date
                'station': station_id, 'product': product, 'units': 'metric', 'time_zone': 'lst_ldt',
                'datum': 'MLLW', 'format': 'json'}
 
-    reply = requests.get('https://api.tidesandcurrents.noaa.gov/api/prod/datagetter', params=payload)
+    reply = get(rt_args.noaa_api_host + '/api/prod/datagetter', params=payload)
     return process_reply(reply)
 
 
 def fetch_tide_offsets_reply(stn_id: int) -> dict:
-    base_str = 'https://api.tidesandcurrents.noaa.gov/mdapi/prod/webapi/stations/{}/tidepredoffsets.json?units=metric'
+    def fetch() -> dict:
+        return rc.cached_reply(stn_id, 'tidepredoffsets', lambda: request_tide_offsets_reply(stn_id))
+
+    return in_flight.do((stn_id, 'tidepredoffsets'), fetch)
+
+
+def request_tide_offsets_reply(stn_id: int) -> dict:
+    base_str = rt_args.noaa_api_host + '/mdapi/prod/webapi/stations/{}/tidepredoffsets.json?units=metric'
     qry_str = base_str.format(stn_id)
-    reply = requests.get(qry_str)
+    reply = get(qry_str)
 
     return process_reply(reply)
 
 
 def fetch_station_info(station_id: int) -> dict:
-    qry_str = 'https://api.tidesandcurrents.noaa.gov/mdapi/prod/webapi/stations/{}.json'.format(station_id)
-    reply = requests.get(qry_str)
+    def fetch() -> dict:
+        return rc.cached_reply(station_id, 'station_info', lambda: request_station_info(station_id))
+
+    return in_flight.do((station_id, 'station_info'), fetch)
+
+
+def request_station_info(station_id: int) -> dict:
+    qry_str = rt_args.noaa_api_host + '/mdapi/prod/webapi/stations/{}.json'.format(station_id)
+    reply = get(qry_str)
+    return process_reply(reply)
+
+
+def fetch_harmonic_constituents_reply(stn_id: int) -> dict:
+    def fetch() -> dict:
+        return rc.cached_reply(stn_id, 'harcon', lambda: request_station_detail_reply(stn_id, 'harcon'))
+
+    return in_flight.do((stn_id, 'harcon'), fetch)
+
+
+def fetch_datums_reply(stn_id: int) -> dict:
+    def fetch() -> dict:
+        return rc.cached_reply(stn_id, 'datums', lambda: request_station_detail_reply(stn_id, 'datums'))
+
+    return in_flight.do((stn_id, 'datums'), fetch)
+
+
+def request_station_detail_reply(stn_id: int, detail: str) -> dict:
+    base_str = rt_args.noaa_api_host + '/mdapi/prod/webapi/stations/{}/{}.json?units=metric'
+    reply = get(base_str.format(stn_id, detail))
     return process_reply(reply)
+
+
+def fetch_station_list_reply() -> dict:
+    def fetch() -> dict:
+        qry_str = rt_args.noaa_api_host + '/mdapi/prod/webapi/stations.json?type=tidepredictions'
+        return rc.cached_reply('all', 'station_list', lambda: process_reply(get(qry_str)))
+
+    return in_flight.do(('all', 'station_list'), fetch)
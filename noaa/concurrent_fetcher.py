@@ -0,0 +1,32 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import runtime_args as rt_args
+import noaa.request_planner as rp
+
+
+def distinct_stations(surveys: list) -> list:
+    stations = {}
+    for ks in surveys:
+        stations[ks.tide_station.id] = ks.tide_station
+    return list(stations.values())
+
+
+def warm_noaa_data(surveys_by_county: dict, workers: int = None) -> int:
+    """
+    Fetch tidal corrections and water level series for all surveys on a thread pool, so create_gis_excel_workbook
+    finds everything in memory.  Returns the number of water level requests made.
+    """
+    if workers is None: workers = rt_args.noaa_workers
+    if workers <= 1 or rt_args.noaa_offline:
+        return rp.prefetch_water_levels(surveys_by_county)
+
+    surveys = rp.all_surveys(surveys_by_county)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        # the water level plan needs each station's reference station, so corrections come first
+        list(pool.map(lambda ts: ts.tidal_correction, distinct_stations(surveys)))
+
+        plan = rp.plan_water_level_requests(surveys)
+        request_count = sum(pool.map(lambda group: rp.load_group(group[0][0], group[1]), plan.items()))
+
+    rp.fill_water_levels(surveys)
+    return request_count
@@ -0,0 +1,183 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+import noaa.api_fetcher as naf
+import runtime_args as rt_args
+from noaa.wtr_lvl_query import WaterLevel
+
+# Local tide prediction from a station's harmonic constituents, used when NOAA has no observed water level
+# (or when running with runtime_args.noaa_offline).  The height above MLLW is
+#
+#     h(t) = Z0 + sum(f * A * cos(V(t) + u - G))
+#
+# where Z0 is MSL above MLLW, A and G are each constituent's amplitude and Greenwich phase (NOAA's phase_GMT),
+# V(t) is the equilibrium argument from the astronomical angles at time t, and f, u are the nodal corrections.
+# See Schureman, "Manual of Harmonic Analysis and Prediction of Tides" (SP 98), and
+#   https://tidesandcurrents.noaa.gov/publications/Computer_Applications_to_Tides_in_the_National_Ocean_Survey.pdf
+#
+# V(t) = d1*tau + d2*s + d3*h + d4*p + d5*p1 + phase, where tau is mean lunar time, s, h, p the mean longitudes
+# of the moon, sun and lunar perigee, and p1 the solar perigee.  tau = 15*UT + h - s is counted from the moon's
+# upper transit (Doodson), without Schureman's 180 degrees in T, so the phases of the odd species (diurnal and
+# terdiurnal) are Doodson's: e.g. K1 = tau + s + 90 is Schureman's T + h - 90.  Nodal terms are (basis, power)
+# pairs: f = product(f_basis ** |power|), u = sum(power * u_basis).
+constituents = {
+    'M2': ((2, 0, 0, 0, 0), 0, [('M2', 1)]),
+    'S2': ((2, 2, -2, 0, 0), 0, []),
+    'N2': ((2, -1, 0, 1, 0), 0, [('M2', 1)]),
+    'K1': ((1, 1, 0, 0, 0), 90, [('K1', 1)]),
+    'M4': ((4, 0, 0, 0, 0), 0, [('M2', 2)]),
+    'O1': ((1, -1, 0, 0, 0), -90, [('O1', 1)]),
+    'M6': ((6, 0, 0, 0, 0), 0, [('M2', 3)]),
+    'MK3': ((3, 1, 0, 0, 0), 90, [('M2', 1), ('K1', 1)]),
+    'S4': ((4, 4, -4, 0, 0), 0, []),
+    'MN4': ((4, -1, 0, 1, 0), 0, [('M2', 2)]),
+    'NU2': ((2, -1, 2, -1, 0), 0, [('M2', 1)]),
+    'S6': ((6, 6, -6, 0, 0), 0, []),
+    'MU2': ((2, -2, 2, 0, 0), 0, [('M2', 1)]),
+    '2N2': ((2, -2, 0, 2, 0), 0, [('M2', 1)]),
+    'OO1': ((1, 3, 0, 0, 0), 90, [('OO1', 1)]),
+    'LAM2': ((2, 1, -2, 1, 0), 180, [('M2', 1)]),
+    'S1': ((1, 1, -1, 0, 0), 180, []),
+    'J1': ((1, 2, 0, -1, 0), 90, [('J1', 1)]),
+    'MM': ((0, 1, 0, -1, 0), 0, [('Mm', 1)]),
+    'SSA': ((0, 0, 2, 0, 0), 0, []),
+    'SA': ((0, 0, 1, 0, 0), 0, []),
+    'MSF': ((0, 2, -2, 0, 0), 0, [('M2', -1)]),
+    'MF': ((0, 2, 0, 0, 0), 0, [('Mf', 1)]),
+    'RHO': ((1, -2, 2, -1, 0), -90, [('O1', 1)]),
+    'Q1': ((1, -2, 0, 1, 0), -90, [('O1', 1)]),
+    'T2': ((2, 2, -3, 0, 1), 0, []),
+    'R2': ((2, 2, -1, 0, -1), 180, []),
+    '2Q1': ((1, -3, 0, 2, 0), -90, [('O1', 1)]),
+    'P1': ((1, 1, -2, 0, 0), -90, []),
+    '2SM2': ((2, 4, -4, 0, 0), 0, [('M2', -1)]),
+    'M3': ((3, 0, 0, 0, 0), 180, [('M2', 1.5)]),
+    'L2': ((2, 1, 0, -1, 0), 180, [('M2', 1)]),  # L2 nodal terms approximated by M2's
+    '2MK3': ((3, -1, 0, 0, 0), -90, [('M2', 2), ('K1', -1)]),
+    'K2': ((2, 2, 0, 0, 0), 0, [('K2', 1)]),
+    'M8': ((8, 0, 0, 0, 0), 0, [('M2', 4)]),
+    'MS4': ((4, 2, -2, 0, 0), 0, [('M2', 1)]),
+}
+
+j2000_unix_secs = 946728000.0  # 2000-01-01 12:00 UTC
+
+
+@dataclass(frozen=True)
+class HarmonicModel:
+    station_id: int
+    mean_level: float     # MSL above MLLW (meters)
+    names: tuple
+    amplitudes: np.ndarray
+    phases: np.ndarray    # Greenwich phase, degrees
+    doodson: np.ndarray   # (constituent, 5) argument coefficients
+    offsets: np.ndarray   # degrees
+
+    def predict(self, unix_secs: np.ndarray) -> np.ndarray:
+        angles = astronomical_angles(unix_secs)
+        v = angles[:, :5] @ self.doodson.T + self.offsets
+        f, u = nodal_corrections(self.names, angles[:, 5])
+        arg = np.radians(v + u - self.phases)
+
+        return self.mean_level + (f * self.amplitudes * np.cos(arg)).sum(axis=1)
+
+
+def astronomical_angles(unix_secs: np.ndarray) -> np.ndarray:
+    """Returns columns tau, s, h, p, p1 (degrees) and N (lunar node) for each time."""
+    t = (unix_secs - j2000_unix_secs) / (86400.0 * 36525.0)  # Julian centuries since J2000
+    s = 218.3164477 + 481267.88123421 * t
+    h = 280.46646 + 36000.76983 * t
+    p = 83.3532465 + 4069.0137287 * t
+    p1 = 282.93735 + 1.71946 * t
+    n = 125.04452 - 1934.136261 * t
+
+    ut_hours = np.mod(unix_secs, 86400.0) / 3600.0
+    tau = 15.0 * ut_hours + h - s
+
+    return np.column_stack((tau, s, h, p, p1, n))
+
+
+def basis_nodal_terms(n_deg: np.ndarray) -> dict:
+    n = np.radians(n_deg)
+    c1, c2, c3 = np.cos(n), np.cos(2 * n), np.cos(3 * n)
+    s1, s2, s3 = np.sin(n), np.sin(2 * n), np.sin(3 * n)
+    return {
+        'M2': (1.0004 - 0.0373 * c1 + 0.0002 * c2, -2.14 * s1),
+        'K1': (1.0060 + 0.1150 * c1 - 0.0088 * c2 + 0.0006 * c3, -8.86 * s1 + 0.68 * s2 - 0.07 * s3),
+        'O1': (1.0089 + 0.1871 * c1 - 0.0147 * c2 + 0.0014 * c3, 10.80 * s1 - 1.34 * s2 + 0.19 * s3),
+        'K2': (1.0241 + 0.2863 * c1 + 0.0083 * c2 - 0.0015 * c3, -17.74 * s1 + 0.68 * s2 - 0.04 * s3),
+        'J1': (1.1029 + 0.1676 * c1 - 0.0170 * c2 + 0.0016 * c3, -12.94 * s1 + 1.34 * s2 - 0.19 * s3),
+        'OO1': (1.1027 + 0.6504 * c1 + 0.0317 * c2 - 0.0014 * c3, -36.68 * s1 + 4.02 * s2 - 0.57 * s3),
+        'Mm': (1.0 - 0.1300 * c1 + 0.0013 * c2, 0.0 * s1),
+        'Mf': (1.0429 + 0.4135 * c1 - 0.004 * c2, -23.74 * s1 + 2.68 * s2 - 0.38 * s3),
+    }
+
+
+def nodal_corrections(names: tuple, n_deg: np.ndarray) -> tuple:
+    basis = basis_nodal_terms(n_deg)
+    f = np.ones((len(n_deg), len(names)))
+    u = np.zeros((len(n_deg), len(names)))
+
+    for i, name in enumerate(names):
+        for b, power in constituents[name][2]:
+            bf, bu = basis[b]
+            f[:, i] *= bf ** abs(power)
+            u[:, i] += power * bu
+
+    return f, u
+
+
+def create_harmonic_model(station_id: int, harcon_reply: dict, datums_reply: dict) -> HarmonicModel:
+    datums = {d['name']: float(d['value']) for d in datums_reply.get('datums', [])}
+    if 'HarmonicConstituents' not in harcon_reply or 'MSL' not in datums or 'MLLW' not in datums:
+        return None
+
+    rows = [c for c in harcon_reply['HarmonicConstituents'] if c['name'] in constituents and c['amplitude']]
+    names = tuple(c['name'] for c in rows)
+
+    return HarmonicModel(station_id,
+                         datums['MSL'] - datums['MLLW'],
+                         names,
+                         np.array([float(c['amplitude']) for c in rows]),
+                         np.array([float(c['phase_GMT']) for c in rows]),
+                         np.array([constituents[n][0] for n in names], dtype=float).reshape(-1, 5),
+                         np.array([constituents[n][1] for n in names], dtype=float))
+
+
+# models are built once per station from the (cached) harcon and datums replies
+known_models = {}
+
+
+def lookup_harmonic_model(station_id: int) -> HarmonicModel:
+    if station_id not in known_models:
+        harcon = naf.fetch_harmonic_constituents_reply(station_id)
+        datums = naf.fetch_datums_reply(station_id)
+        known_models[station_id] = create_harmonic_model(station_id, harcon, datums)
+
+    return known_models[station_id]
+
+
+def as_unix_secs(datetimes: list) -> np.ndarray:
+    # naive times are local, like the lst_ldt water level queries
+    local_tz = ZoneInfo(rt_args.local_time_zone)
+
+    def utc_secs(dt: datetime) -> float:
+        if dt.tzinfo is None: dt = dt.replace(tzinfo=local_tz)
+        return dt.astimezone(timezone.utc).timestamp()
+
+    return np.array([utc_secs(dt) for dt in datetimes], dtype=float)
+
+
+def predict_mllw_heights(station_id: int, datetimes: list) -> np.ndarray:
+    """Predicted heights above MLLW (meters) for all datetimes in one vectorized call; NaN without a model."""
+    model = lookup_harmonic_model(station_id)
+    if model is None or len(datetimes) == 0:
+        return np.full(len(datetimes), np.nan)
+
+    return model.predict(as_unix_secs(datetimes))
+
+
+def predict_water_level(station_id: int, dt: datetime) -> WaterLevel:
+    return WaterLevel('harmonic_prediction', float(predict_mllw_heights(station_id, [dt])[0]))
@@ -1,8 +1,12 @@
 from dataclasses import dataclass
-from datetime import date, time, datetime
+from datetime import date, time, datetime, timedelta
+from math import isnan
+
+import numpy as np
 
 from models.tidal_station import TidalStation
 
+import noaa.harmonic_predictor as hp
 import noaa.wtr_lvl_query as wlq
 from noaa.wtr_lvl_query import WaterLevel
 
@@ -14,10 +18,33 @@ class MllDepthAdjuster:
     start_time: time
     _water_level: WaterLevel = None
 
+    def reference_station_id(self) -> int:
+        return int(self.tidal_station.tidal_correction.reference_station_id)
+
+    def start_datetime(self) -> datetime:
+        return datetime.combine(self.data_date, self.start_time)
+
+    def reference_datetime(self) -> datetime:
+        # the tide at a subordinate station lags the reference station by the correction's time offset (minutes)
+        t_offset = self.tidal_station.tidal_correction.time_offset
+        return self.start_datetime() - timedelta(minutes=t_offset)
+
+    def observed_water_level(self) -> WaterLevel:
+        return wlq.derive_mllw_water_height(self.reference_station_id(), self.reference_datetime())
+
+    def assign_water_level(self, level: WaterLevel):
+        self._water_level = level
+
     def initialize_water_level(self):
-        ref_stn = self.tidal_station.tidal_correction.reference_station_id
-        start_dt = datetime.combine(self.data_date, self.start_time)
-        self._water_level = wlq.derive_mllw_water_height(ref_stn, start_dt)
+        self._water_level = self.observed_water_level()
+
+        # no NOAA observations (or none archived or cached, offline) - fall back to the harmonic prediction
+        if isnan(self._water_level.value):
+            self._water_level = hp.predict_water_level(self.reference_station_id(), self.reference_datetime())
+
+    def water_level(self) -> WaterLevel:
+        if (self._water_level is None): self.initialize_water_level()
+        return self._water_level
 
     def adjust_depth(self, meas_depth: float) -> float:
         if meas_depth == float("NaN"): return float("NaN")
@@ -30,5 +57,23 @@ class MllDepthAdjuster:
         return meas_depth - adjusted_noaa_depth
 
 
+def adjust_depths(adjusters: list, depths: np.ndarray) -> np.ndarray:
+    """
+    Column-wise adjust_depth: depths has one row per adjuster (any number of columns).  Each station's tidal
+    correction is read once, and the adjustment is a handful of array operations over every row.
+    """
+    corrections = {}
+    for da in adjusters:
+        stn = da.tidal_station
+        if stn.id not in corrections: corrections[stn.id] = stn.tidal_correction
+
+    water_levels = np.array([da.water_level().value for da in adjusters], dtype=float)
+    scaling = np.array([corrections[da.tidal_station.id].height_scaling for da in adjusters], dtype=float)
+    offsets = np.array([corrections[da.tidal_station.id].height_offset for da in adjusters], dtype=float)
+
+    adjusted_noaa_depth = water_levels * scaling + offsets
+    return depths - adjusted_noaa_depth.reshape(-1, 1)
+
+
 def create_depth_adjuster(ts: TidalStation, dt: date, st: time) -> MllDepthAdjuster:
     return MllDepthAdjuster(ts, dt, st)
@@ -0,0 +1,151 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import runtime_args as rt_args
+
+# Local SQLite cache of NOAA replies, keyed by station, product and time window.
+#
+# Station metadata and tide offsets are effectively static, and verified water levels never change once NOAA
+# publishes them.  Recent water levels may still be preliminary, and replies without data may be filled in
+# later, so those expire sooner.  All times below are in seconds.
+day_secs = 24 * 3600
+
+product_ttls = {'station_info': 90 * day_secs,
+                'tidepredoffsets': 90 * day_secs,
+                'station_list': 90 * day_secs,
+                'harcon': 365 * day_secs,
+                'datums': 365 * day_secs,
+                'one_minute_water_level': 365 * day_secs,
+                'water_level': 365 * day_secs}
+
+default_ttl = 30 * day_secs
+recent_data_ttl = day_secs  # water levels less than recent_data_age old
+recent_data_age = timedelta(days=30)
+error_ttl = day_secs  # replies without data (an 'error' entry, or no 'stations' for station_info)
+
+# Replies from a cassette or a stand-in server (utils/http_cassette.py, replay_server.py, the benchmarks) are never
+# read from or stored in the cache: they may be injected errors or missing recordings, and the cache key has no host.
+live_noaa_host = 'https://api.tidesandcurrents.noaa.gov'
+
+# kelp.py's county workers (utils/county_pool.py) share the cache file: it is opened in WAL mode, so reads do not wait
+# for writes, and a write still waiting for the lock after lock_timeout_secs is skipped rather than failing the run.
+lock_timeout_secs = 30.0
+
+_connection = None
+_lock = threading.Lock()
+
+
+def _db() -> sqlite3.Connection:
+    global _connection
+    if _connection is None:
+        db_path = rt_args.noaa_cache_path
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+        _connection = sqlite3.connect(db_path, check_same_thread=False, timeout=lock_timeout_secs)
+        _connection.execute('PRAGMA journal_mode=WAL')
+        _connection.execute('CREATE TABLE IF NOT EXISTS replies ('
+                            'station TEXT, product TEXT, begin_date TEXT, end_date TEXT, '
+                            'fetched REAL, expires REAL, reply TEXT, '
+                            'PRIMARY KEY (station, product, begin_date, end_date))')
+        _connection.commit()
+
+    return _connection
+
+
+def reply_ttl(product: str, reply: dict, end_date: datetime = None) -> float:
+    if 'error' in reply or (product in ('station_info', 'station_list') and 'stations' not in reply):
+        return error_ttl
+
+    if end_date is not None and datetime.now() - end_date.replace(tzinfo=None) < recent_data_age:
+        return recent_data_ttl
+
+    return product_ttls.get(product, default_ttl)
+
+
+def get_reply(station_id, product: str, begin_date: str = '', end_date: str = '') -> dict:
+    with _lock:
+        row = _db().execute('SELECT reply, expires FROM replies '
+                            'WHERE station = ? AND product = ? AND begin_date = ? AND end_date = ?',
+                            (str(station_id), product, begin_date, end_date)).fetchone()
+
+    if row is None or row[1] < time.time():
+        return None
+
+    return json.loads(row[0])
+
+
+def put_reply(station_id, product: str, reply: dict, ttl: float, begin_date: str = '', end_date: str = ''):
+    now = time.time()
+    with _lock:
+        db = _db()
+        try:
+            db.execute('INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?, ?, ?, ?)',
+                       (str(station_id), product, begin_date, end_date, now, now + ttl, json.dumps(reply)))
+            db.commit()
+        except sqlite3.OperationalError as e:
+            db.rollback()
+            print('\t\tNOAA reply for station {} not cached: {}'.format(station_id, e))
+
+
+def caching() -> bool:
+    return (rt_args.noaa_cache_enabled and not rt_args.http_cassette_mode and
+            rt_args.noaa_api_host.rstrip('/') == live_noaa_host)
+
+
+def cached_reply(station_id, product: str, fetch, begin: datetime = None, end: datetime = None) -> dict:
+    """
+    Return the cached reply for the key, calling fetch() and storing its reply on a miss.  Offline, fetch() is never
+    called: a miss is an error reply.
+    """
+    offline_reply = {'error': {'message': 'No cached {} reply for station {} (offline)'.format(product, station_id)}}
+    if not caching():
+        return offline_reply if rt_args.noaa_offline else fetch()
+
+    begin_str = '' if begin is None else begin.strftime('%Y%m%d %H:%M')
+    end_str = '' if end is None else end.strftime('%Y%m%d %H:%M')
+
+    reply = get_reply(station_id, product, begin_str, end_str)
+    if reply is None and rt_args.noaa_offline:
+        return offline_reply
+
+    if reply is None:
+        reply = fetch()
+        put_reply(station_id, product, reply, reply_ttl(product, reply, end), begin_str, end_str)
+
+    return reply
+
+
+def invalidate(station_id=None, product: str = None) -> int:
+    """Remove cached replies for a station and/or product (everything when neither is given)."""
+    clauses = []
+    params = []
+    if station_id is not None:
+        clauses.append('station = ?')
+        params.append(str(station_id))
+    if product is not None:
+        clauses.append('product = ?')
+        params.append(product)
+
+    qry = 'DELETE FROM replies'
+    if clauses:
+        qry += ' WHERE ' + ' AND '.join(clauses)
+
+    with _lock:
+        db = _db()
+        removed = db.execute(qry, params).rowcount
+        db.commit()
+
+    return removed
+
+
+def remove_expired() -> int:
+    with _lock:
+        db = _db()
+        removed = db.execute('DELETE FROM replies WHERE expires < ?', (time.time(),)).rowcount
+        db.commit()
+
+    return removed
@@ -0,0 +1,93 @@
+from collections import defaultdict
+from itertools import compress
+
+import numpy as np
+
+import noaa.harmonic_predictor as hp
+import noaa.wtr_lvl_query as wlq
+from noaa.wtr_lvl_query import WaterLevel
+
+
+def valid_adjusters(surveys: list) -> list:
+    adjusters = []
+    for ks in surveys:
+        try:
+            adjusters.append(ks.depth_adjuster)
+        except ValueError:
+            continue  # invalid survey date or time; reported when the GIS worksheet is built
+
+    return adjusters
+
+
+# Surveys on the same day frequently share a reference station.  Rather than one datagetter call (plus a
+# 6 minute fallback) per survey, group the survey times (shifted by the subordinate station's time offset) by
+# (reference station, date) and fetch one ranged series per group.  fill_water_levels then interpolates every
+# survey's water level from the in-memory series.
+def plan_water_level_requests(surveys: list) -> dict:
+    groups = defaultdict(list)
+
+    for da in valid_adjusters(surveys):
+        ref_dt = da.reference_datetime().replace(tzinfo=None)
+        groups[(da.reference_station_id(), ref_dt.date())].append(ref_dt)
+
+    return groups
+
+
+def fill_water_levels(surveys: list) -> int:
+    """
+    Assign every survey its water level at the (time shifted) reference station time, interpolating the loaded
+    series for all of a station's surveys at once, and predicting the rest with one vectorized call per station.
+    Returns the number of predicted levels.
+    """
+    by_station = defaultdict(list)
+    for da in valid_adjusters(surveys):
+        by_station[da.reference_station_id()].append(da)
+
+    predicted_count = 0
+    for stn_id, adjusters in by_station.items():
+        ref_times = [da.reference_datetime() for da in adjusters]
+        values, sources = wlq.interpolate_water_levels(stn_id, ref_times)
+
+        missing = np.isnan(values)
+        if missing.any():
+            values[missing] = hp.predict_mllw_heights(stn_id, list(compress(ref_times, missing)))
+            sources[missing] = 'harmonic_prediction'
+            predicted_count += int(missing.sum())
+
+        for da, v, src in zip(adjusters, values, sources):
+            da.assign_water_level(WaterLevel(src, float(v)))
+
+    return predicted_count
+
+
+def load_group(stn_id: int, ref_times: list) -> int:
+    """Load the series for one (station, date) group, returning the number of ranged requests made."""
+    if not np.isnan(wlq.interpolate_water_levels(stn_id, ref_times)[0]).any():
+        return 0  # already loaded, or in the season archive
+
+    begin = wlq.floor_minute(min(ref_times))
+    end = wlq.floor_minute(max(ref_times)) + wlq.one_min
+
+    one_min = wlq.load_water_level_series(stn_id, begin, end, 'one_minute_water_level')
+    if not np.isnan(one_min.interpolate(wlq.as_epoch_secs(ref_times))).any():
+        return 1
+
+    wlq.load_water_level_series(stn_id, begin - wlq.six_min, end + wlq.six_min, 'water_level')
+    return 2
+
+
+def all_surveys(surveys_by_county: dict) -> list:
+    return [s for county in surveys_by_county.keys() for s in surveys_by_county[county]]
+
+
+def prefetch_water_levels(surveys_by_county: dict) -> int:
+    """Load water level series for every survey, returning the number of ranged requests made."""
+    surveys = all_surveys(surveys_by_county)
+
+    # offline, groups are loaded from the NOAA cache only (see noaa/reply_cache.py)
+    request_count = 0
+    for (stn_id, day), ref_times in plan_water_level_requests(surveys).items():
+        request_count += load_group(stn_id, ref_times)
+
+    fill_water_levels(surveys)
+    return request_count
@@ -0,0 +1,43 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller runs the fetch, and callers arriving while it is
+    in flight wait on its future instead of issuing a duplicate request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.calls = 0
+        self.saved = 0
+
+    def do(self, key, fetch):
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.saved += 1
+
+        if not is_owner:
+            return future.result()
+
+        try:
+            result = fetch()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stats(self) -> str:
+        return '{} lookups, {} duplicate in-flight requests saved'.format(self.calls, self.saved)
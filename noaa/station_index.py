@@ -0,0 +1,84 @@
+import math
+from dataclasses import dataclass
+
+import noaa.api_fetcher as naf
+
+# Index of every NOAA tide prediction station, built once from the (cached) mdapi station list.  Lookups by id are
+# dictionary reads, and a grid over station coordinates answers "nearest tide station to this GPS point".
+grid_degrees = 0.5
+earth_radius_km = 6371.0
+
+
+@dataclass(frozen=True)
+class StationInfo:
+    id: str
+    name: str
+    lat: float
+    lng: float
+
+
+def distance_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    # https://en.wikipedia.org/wiki/Haversine_formula
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    d_lat = p2 - p1
+    d_lng = math.radians(lng2 - lng1)
+    a = math.sin(d_lat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(d_lng / 2) ** 2
+    return 2 * earth_radius_km * math.asin(math.sqrt(a))
+
+
+def grid_cell(lat: float, lng: float) -> tuple:
+    return math.floor(lat / grid_degrees), math.floor(lng / grid_degrees)
+
+
+class StationIndex:
+    def __init__(self, stations: list):
+        self.by_id = {}
+        self.grid = {}
+        for s in stations:
+            self.by_id[s.id] = s
+            self.grid.setdefault(grid_cell(s.lat, s.lng), []).append(s)
+
+    def station_info(self, station_id) -> StationInfo:
+        return self.by_id.get(str(station_id))
+
+    def nearest(self, lat: float, lng: float, max_km: float = 100.0) -> StationInfo:
+        """Closest station within max_km of the point, searching rings of grid cells outward."""
+        if not self.grid:
+            return None
+
+        row, col = grid_cell(lat, lng)
+        # a grid cell is at least this many km across in either direction (longitude cells shrink with latitude)
+        lng_scale = max(math.cos(math.radians(min(abs(lat), 89.0))), 0.01)
+        cell_km = math.radians(grid_degrees) * earth_radius_km * lng_scale
+        best, best_km = None, max_km
+
+        ring = 0
+        while (ring - 1) * cell_km <= best_km:
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    for s in self.grid.get((r, c), []):
+                        d = distance_km(lat, lng, s.lat, s.lng)
+                        if d <= best_km:
+                            best, best_km = s, d
+            ring += 1
+
+        return best
+
+
+def create_station_index(reply: dict) -> StationIndex:
+    stations = [StationInfo(str(s['id']), s['name'], float(s['lat']), float(s['lng']))
+                for s in reply.get('stations', []) if s.get('lat') is not None and s.get('lng') is not None]
+    return StationIndex(stations)
+
+
+_station_index = None
+
+
+def station_index() -> StationIndex:
+    global _station_index
+    if _station_index is None:
+        _station_index = create_station_index(naf.fetch_station_list_reply())
+
+    return _station_index
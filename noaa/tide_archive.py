@@ -0,0 +1,81 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import noaa.api_fetcher as naf
+import runtime_args as rt_args
+
+# A collection year of water levels per station, stored as .npy time/height arrays and opened memory-mapped, so
+# lookups read only the pages they touch.  Built once by prefetch_tides.py, after which kelp.py needs no network
+# for water levels.
+#
+# datagetter limits each request to 4 days of one minute data and 31 days of 6 minute data.
+archive_products = {'one_minute_water_level': 4, 'water_level': 31}
+
+# (station_id, product, year) -> (times, heights) memory-mapped arrays, or None when not archived
+open_archives = {}
+
+
+def archive_paths(station_id: int, product: str, year: int) -> tuple:
+    base = os.path.join(rt_args.tide_archive_dir, str(year), '{}_{}'.format(station_id, product))
+    return base + '_times.npy', base + '_heights.npy'
+
+
+def year_chunks(year: int, days: int) -> list:
+    chunks = []
+    begin = datetime(year, 1, 1)
+    year_end = datetime(year + 1, 1, 1)
+    while begin < year_end:
+        end = min(begin + timedelta(days=days), year_end)
+        chunks.append((begin, end - timedelta(minutes=1)))
+        begin = end
+
+    return chunks
+
+
+def fetch_year(station_id: int, product: str, year: int) -> tuple:
+    times = []
+    heights = []
+    for begin, end in year_chunks(year, archive_products[product]):
+        # straight to NOAA; a year of one minute data does not belong in the reply cache
+        reply = naf.request_water_data_reply(station_id, begin, end, product)
+        for e in reply.get('data', []):
+            times.append(e['t'])
+            heights.append(float(e['v']) if e['v'] else float('NaN'))
+
+    return np.array(times, dtype='datetime64[m]'), np.array(heights, dtype=np.float32)
+
+
+def save_array(path: str, values: np.ndarray):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, values)
+    os.replace(tmp_path, path)
+
+
+def archive_year(station_id: int, product: str, year: int) -> int:
+    """Fetch and store the year for one station and product, returning the number of samples stored."""
+    times, heights = fetch_year(station_id, product, year)
+    order = np.argsort(times, kind='stable')
+
+    times_path, heights_path = archive_paths(station_id, product, year)
+    os.makedirs(os.path.dirname(times_path), exist_ok=True)
+    save_array(heights_path, heights[order])
+    save_array(times_path, times[order])
+
+    open_archives.pop((station_id, product, year), None)
+    return len(times)
+
+
+def archived_arrays(station_id: int, product: str, year: int) -> tuple:
+    """Memory-mapped (times, heights) for the station, product and year, or None if it was not prefetched."""
+    key = (station_id, product, year)
+    if key not in open_archives:
+        times_path, heights_path = archive_paths(station_id, product, year)
+        if os.path.exists(times_path) and os.path.exists(heights_path):
+            open_archives[key] = (np.load(times_path, mmap_mode='r'), np.load(heights_path, mmap_mode='r'))
+        else:
+            open_archives[key] = None
+
+    return open_archives[key]
@@ -1,7 +1,11 @@
 from dataclasses import dataclass
 from datetime import datetime, timedelta
+from itertools import compress
+
+import numpy as np
 
 import noaa.api_fetcher as naf
+import noaa.tide_archive as ta
 
 @dataclass()
 class WaterLevel:
@@ -11,27 +15,180 @@ class WaterLevel:
     def is_estimated(self) -> bool:
         return self.source_name != 'one_minute_water_level'
 
-def extract_first_v_or_nan(json: dict) -> float:
-    if 'data' in json:
-        elements = list(json['data'])
-        if len(elements) > 0:
-            return float(elements[0]['v'])
-    return float('Nan')
 
-def derive_mllw_water_height(station_id: int, dt: datetime) -> WaterLevel:
-    import math
-    reply = naf.fetch_water_data_reply(station_id, dt, dt)
+# seconds between NOAA samples for each product.  Values are only interpolated between samples at most two
+# intervals apart, so gaps in the data (or between fetched windows) are never bridged.
+sample_interval_secs = {'one_minute_water_level': 60.0, 'water_level': 360.0}
 
-    level_v = extract_first_v_or_nan(reply)
-    if math.isnan(level_v) == False:
-        return WaterLevel('one_minute_water_level', level_v)
 
-    # no 1 minute data - try the 6 minute query
-    six_min = timedelta(0, 0, 0, 0, 6, 0, 0)
-    reply = naf.fetch_water_data_reply(station_id, dt - six_min, dt + six_min, 'water_level')
-    level_v = extract_first_v_or_nan(reply)
+@dataclass()
+class WaterLevelSeries:
+    """Water levels for one station and product, fetched for the window [begin, end]"""
+    station_id: int
+    source_name: str
+    begin: np.datetime64
+    end: np.datetime64
+    times: np.ndarray   # datetime64[m], sorted
+    values: np.ndarray  # float, NaN where NOAA has no value
+
+    def covers(self, begin: datetime, end: datetime) -> bool:
+        return self.begin <= as_minute(begin) and as_minute(end) <= self.end
+
+    def interpolate(self, at_secs: np.ndarray) -> np.ndarray:
+        """Linearly interpolated values at each time (epoch seconds); NaN outside the data or across gaps."""
+        if len(at_secs) == 0:
+            return np.array([], dtype=float)
+
+        # only read the samples around the requested times (the arrays may be memory-mapped archives)
+        first = np.datetime64(int(np.floor(at_secs.min() / 60.0)), 'm')
+        last = np.datetime64(int(np.ceil(at_secs.max() / 60.0)), 'm')
+        lo = max(0, int(np.searchsorted(self.times, first, 'right')) - 3)
+        hi = int(np.searchsorted(self.times, last, 'left')) + 3
+        window_t = np.asarray(self.times[lo:hi])
+        window_v = np.asarray(self.values[lo:hi], dtype=float)
+
+        has_value = ~np.isnan(window_v)
+        t = window_t[has_value].astype('datetime64[s]').astype(float)
+        v = window_v[has_value]
+
+        if len(t) == 0:
+            return np.full(len(at_secs), np.nan)
+        if len(t) == 1:
+            return np.where(at_secs == t[0], v[0], np.nan)
+
+        result = np.interp(at_secs, t, v, left=np.nan, right=np.nan)
+
+        # times falling exactly on a sample are observations, even next to a gap
+        i = np.clip(np.searchsorted(t, at_secs), 1, len(t) - 1)
+        across_gap = t[i] - t[i - 1] > 2 * sample_interval_secs[self.source_name]
+        result[across_gap & ~np.isin(at_secs, t)] = np.nan
+
+        return result
+
+    def interpolate_at(self, dt: datetime) -> float:
+        return float(self.interpolate(as_epoch_secs([dt]))[0])
+
+
+# series loaded by load_water_level_series, keyed by (station_id, product)
+known_series = {}
+
+one_min = timedelta(0, 0, 0, 0, 1, 0, 0)
+six_min = timedelta(0, 0, 0, 0, 6, 0, 0)
+
+
+def as_minute(dt: datetime) -> np.datetime64:
+    return np.datetime64(dt.replace(tzinfo=None), 'm')
+
+
+def as_epoch_secs(datetimes: list) -> np.ndarray:
+    # times stay in local time (lst_ldt), the same as the NOAA replies
+    return np.array([np.datetime64(dt.replace(tzinfo=None), 's') for dt in datetimes],
+                    dtype='datetime64[s]').astype(float)
+
+
+def floor_minute(dt: datetime) -> datetime:
+    return dt.replace(tzinfo=None, second=0, microsecond=0)
+
+
+def series_from_reply(station_id: int, product: str, begin: datetime, end: datetime,
+                      json: dict) -> WaterLevelSeries:
+    elements = list(json['data']) if 'data' in json else []
+    times = np.array([e['t'] for e in elements], dtype='datetime64[m]')
+    values = np.array([float(e['v']) if e['v'] else float('NaN') for e in elements], dtype=float)
+
+    return WaterLevelSeries(station_id, product, as_minute(begin), as_minute(end), times, values)
 
-    return WaterLevel('water_level', level_v)
 
+def load_water_level_series(station_id: int, begin: datetime, end: datetime,
+                            product: str = 'one_minute_water_level') -> WaterLevelSeries:
+    """Fetch one ranged reply for [begin, end] and keep it for derive_mllw_water_height lookups."""
+    reply = naf.fetch_water_data_reply(station_id, begin, end, product)
+    series = series_from_reply(station_id, product, begin, end, reply)
+    known_series.setdefault((station_id, product), []).append(series)
+
+    return series
+
+
+def find_series(station_id: int, product: str, begin: datetime, end: datetime) -> WaterLevelSeries:
+    for series in known_series.get((station_id, product), []):
+        if series.covers(begin, end):
+            return series
+    return None
+
+
+def merged_series(station_id: int, product: str) -> WaterLevelSeries:
+    """All series loaded for the station and product as one sorted series."""
+    loaded = known_series.get((station_id, product), [])
+    if len(loaded) == 1:
+        return loaded[0]
+
+    times = np.concatenate([s.times for s in loaded]) if loaded else np.array([], dtype='datetime64[m]')
+    values = np.concatenate([s.values for s in loaded]) if loaded else np.array([], dtype=float)
+    times, first = np.unique(times, return_index=True)
+
+    return WaterLevelSeries(station_id, product, np.datetime64('NaT'), np.datetime64('NaT'), times, values[first])
+
+
+def archived_series(station_id: int, product: str, year: int) -> WaterLevelSeries:
+    arrays = ta.archived_arrays(station_id, product, year)
+    if arrays is None:
+        return None
+
+    return WaterLevelSeries(station_id, product, np.datetime64(datetime(year, 1, 1), 'm'),
+                            np.datetime64(datetime(year, 12, 31, 23, 59), 'm'), arrays[0], arrays[1])
+
+
+def interpolate_product(station_id: int, product: str, datetimes: list) -> np.ndarray:
+    """Interpolate from the loaded series, then from the season archive for whatever is still missing."""
+    at_secs = as_epoch_secs(datetimes)
+    values = merged_series(station_id, product).interpolate(at_secs)
+
+    years = np.array([dt.year for dt in datetimes])
+    for year in set(years[np.isnan(values)]):
+        archive = archived_series(station_id, product, int(year))
+        if archive is not None:
+            in_year = np.isnan(values) & (years == year)
+            values[in_year] = archive.interpolate(at_secs[in_year])
+
+    return values
+
+
+def interpolate_water_levels(station_id: int, datetimes: list) -> tuple:
+    """
+    Water levels at each reference station time from the series already loaded (or archived), computed in one
+    pass: one minute data where available, otherwise 6 minute data.  Returns (values, source names); NaN where
+    neither has data.
+    """
+    values = interpolate_product(station_id, 'one_minute_water_level', datetimes)
+    sources = np.full(len(values), 'one_minute_water_level', dtype=object)
+
+    missing = np.isnan(values)
+    if missing.any():
+        values[missing] = interpolate_product(station_id, 'water_level', list(compress(datetimes, missing)))
+        sources[missing] = 'water_level'
+
+    return values, sources
+
+
+def derive_mllw_water_height(station_id: int, dt: datetime) -> WaterLevel:
+    values, sources = interpolate_water_levels(station_id, [dt])
+    if not np.isnan(values[0]):
+        return WaterLevel(sources[0], float(values[0]))
+
+    begin = floor_minute(dt)
+    end = begin + one_min
+
+    series = find_series(station_id, 'one_minute_water_level', begin, end)
+    if series is None:
+        series = load_water_level_series(station_id, begin, end, 'one_minute_water_level')
+
+    level_v = series.interpolate_at(dt)
+    if not np.isnan(level_v):
+        return WaterLevel('one_minute_water_level', level_v)
 
+    # no 1 minute data - try the 6 minute data
+    series = find_series(station_id, 'water_level', begin - six_min, end + six_min)
+    if series is None:
+        series = load_water_level_series(station_id, begin - six_min, end + six_min, 'water_level')
 
+    return WaterLevel('water_level', series.interpolate_at(dt))
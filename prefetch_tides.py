@@ -0,0 +1,39 @@
+"""
+Download a collection year of NOAA water levels for the reference stations of every known tide station, so kelp.py
+can later run without network access.
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import runtime_args as rt_args
+import noaa.tide_archive as ta
+from models.tidal_station import known_stations
+
+
+def main():
+    data_year: int = rt_args.select_collection_year()
+
+    print("\nRuntime parameters")
+    print('\tYear: ' + str(data_year))
+    print('\tArchive directory: ' + rt_args.tide_archive_dir)
+
+    print('\n\tfinding reference stations.')
+    ref_ids = sorted({int(s.tidal_correction.reference_station_id) for s in known_stations.values()} - {0})
+
+    jobs = [(stn_id, product) for stn_id in ref_ids for product in ta.archive_products.keys()]
+    print('\tarchiving {} stations.'.format(len(ref_ids)))
+
+    def archive(job: tuple) -> str:
+        stn_id, product = job
+        sample_count = ta.archive_year(stn_id, product, data_year)
+        return '\t\t{} {}: {} samples'.format(stn_id, product, sample_count)
+
+    with ThreadPoolExecutor(max_workers=rt_args.noaa_workers) as pool:
+        for line in pool.map(archive, jobs):
+            print(line)
+
+    print('Done.')
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""
+Serve a recorded NOAA/SmugMug cassette over HTTP, as a local stand-in for the live services.
+Point noaa_api_host and smugmug_api_host in runtime_args.py at the printed address.
+"""
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import runtime_args as rt_args
+import utils.http_cassette as hc
+
+default_port: int = 8765
+
+
+def create_handler(cassette: hc.Cassette):
+    class CassetteHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            rec = cassette.playback(hc.interaction_key('GET', self.path))
+            body = rec['body'].encode('utf-8')
+
+            self.send_response(rec['status'], rec['reason'])
+            for k, v in rec['headers'].items():
+                self.send_header(k, v)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return CassetteHandler
+
+
+def select_cassette_path() -> str:
+    candidate = input("Enter cassette file (blank = {}): ".format(rt_args.http_cassette_path)).strip()
+    if len(candidate) > 0:
+        return candidate
+
+    return rt_args.http_cassette_path
+
+
+def select_port() -> int:
+    candidate = input("Enter port (blank = {}): ".format(default_port)).strip()
+    if len(candidate) > 0:
+        return int(candidate)
+
+    return default_port
+
+
+def main():
+    cassette_path = select_cassette_path()
+    port = select_port()
+
+    cassette = hc.Cassette(cassette_path, rt_args.http_replay_latency_secs, rt_args.http_replay_error_rate)
+    server = ThreadingHTTPServer(('127.0.0.1', port), create_handler(cassette))
+
+    rt_args.print_runtime_args([("Cassette", cassette_path),
+                                ("Interactions", str(len(cassette.interactions))),
+                                ("Latency (secs)", str(rt_args.http_replay_latency_secs)),
+                                ("Error rate", str(rt_args.http_replay_error_rate)),
+                                ("Address", 'http://127.0.0.1:{}'.format(port))])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('Done.')
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,9 +8,66 @@ default_year: int = 2023
 default_excel: str = '/Users/Richard/Documents/NWStraits/KelpProject/2023_Data/Kelp_Data_2023_-_all_versions_-_False_-_2023-12-28-19-01-19.xlsx'
 default_attach_dir: str = '/Users/Richard/Documents/NWStraits/KelpProject/2023_Data/attachments'
 default_output_dir: str = '/Users/Richard/Documents/NWStraits/KelpProject/testing'
+default_batch_jobs: str = '/Users/Richard/Documents/NWStraits/KelpProject/batch_jobs.csv'
+
+# local cache of NOAA station metadata, tide offsets and water levels.  Delete the file (or use
+# noaa.reply_cache.invalidate) to force fresh queries.
+noaa_cache_enabled: bool = True
+noaa_cache_path: str = os.path.join(os.path.expanduser('~'), '.nwstraits', 'noaa_cache.sqlite')
+
+# NOAA queries run on noaa_workers threads (1 = one at a time), limited to noaa_requests_per_second per host
+noaa_api_host: str = 'https://api.tidesandcurrents.noaa.gov'
+noaa_workers: int = 8
+noaa_requests_per_second: float = 10.0
+noaa_timeout_secs: float = 60.0
+
+# Water levels missing from NOAA are predicted from the station's harmonic constituents.  With noaa_offline set,
+# nothing is fetched: water levels come from the tide archive (prefetch_tides.py) and the NOAA cache, and only those
+# in neither are predicted.
+noaa_offline: bool = False
+
+# Columns the models use are parsed from the Kobo export once, and cached (by the file's content hash) for re-runs
+kobo_cache_enabled: bool = True
+kobo_cache_dir: str = os.path.join(os.path.expanduser('~'), '.nwstraits', 'kobo_cache')
+
+# kelp.py and anchoring.py process each county in its own process, on county_workers processes (1 = all in this one)
+county_workers: int = 1
+
+# attachment directory listings are saved, and only directories changed since the last run are listed again
+attachment_index_enabled: bool = True
+attachment_index_dir: str = os.path.join(os.path.expanduser('~'), '.nwstraits', 'attachment_index')
+
+# attachments are copied on copy_workers threads (1 = one at a time)
+copy_workers: int = 8
+# files copied into an output directory are recorded in its copyManifest.json; re-runs skip unchanged files, and
+# verify.py checks the output against it on verify_workers threads
+copy_manifest_enabled: bool = True
+verify_workers: int = os.cpu_count() or 4
+# 'copy' or 'link' (reflink, else hardlink, else copy - see utils/copy_engine.py); asked for on each run
+default_copy_mode: str = 'copy'
+
+# Exports can also be read from the KoboToolbox API (kobo:<asset uid> at the export prompt), a page at a time
+kobo_api_host: str = 'https://kf.kobotoolbox.org'
+kobo_api_token: str = ''
+kobo_page_size: int = 1000
+kobo_prefetch_pages: int = 2
+kobo_timeout_secs: float = 60.0
+
+# collection year water level archives written by prefetch_tides.py
+tide_archive_dir: str = os.path.join(os.path.expanduser('~'), '.nwstraits', 'tide_archive')
+local_time_zone: str = 'America/Los_Angeles'
+
+# Record ('record') or replay ('replay') NOAA and SmugMug traffic with a local cassette ('' = live services).
+# Replayed responses can be slowed down, or fail (HTTP 503) at the given rate, for benchmarking and load tests.
+# The NOAA cache is not used while recording or replaying, or while noaa_api_host is not the live NOAA host.
+http_cassette_mode: str = ''
+http_cassette_path: str = os.path.join(os.path.expanduser('~'), '.nwstraits', 'cassette.jsonl')
+http_replay_latency_secs: float = 0.0
+http_replay_error_rate: float = 0.0
 
 # login to SmugMug, and follow the API Keys on this page: https://www.smugmug.com/app/account/settings?nick=nwstraits
 smug_mug_key: str = 'go get the right key from Suzanne'
+smugmug_api_host: str = 'https://api.smugmug.com'
 
 
 def select_collection_year() -> int:
@@ -21,7 +78,7 @@ def select_collection_year() -> int:
     return default_year
 
 def select_database_path() -> str:
-    input_xlsx = input("Enter .xlsx file to read: ").strip()
+    input_xlsx = input("Enter export to read (.xlsx, .csv, .json, .jsonl or kobo:<asset uid>): ").strip()
     if len(input_xlsx) > 0:
         return input_xlsx
 
@@ -41,6 +98,19 @@ def select_target_dir(year: int) -> str:
 
     return os.path.join(default_output_dir, str(year))
 
+def select_incremental() -> bool:
+    candidate = input("Only process new or changed submissions in an existing output directory (y/n) (blank = n): ")
+    return candidate.strip().lower().startswith('y')
+
+def select_copy_mode() -> str:
+    default_link = default_copy_mode == 'link'
+    candidate = input("Link output files to the attachments instead of copying them (y/n) (blank = {}): "
+                      .format('y' if default_link else 'n')).strip().lower()
+    if len(candidate) > 0:
+        return 'link' if candidate.startswith('y') else 'copy'
+
+    return default_copy_mode
+
 def print_runtime_args(args: list):
     print("Runtime parameters")
     for k, v in args:
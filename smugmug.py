@@ -16,6 +16,10 @@ from pandas import DataFrame
 import requests
 
 from models.kelp_data_frame import as_data_frame
+import utils.http_cassette as hc
+
+session = requests.Session()
+hc.install(session)
 
 
 def main():
@@ -83,7 +87,7 @@ def images_for_year(year: int) -> list:
         album_uri = y_node['Uris']['Album']['Uri']
 
         # https://api.smugmug.com/api/v2/doc/reference/image.html - see section on getting images for sharing
-        url = 'https://api.smugmug.com' + album_uri + '!images?start=1&count=200'
+        url = rt_args.smugmug_api_host + album_uri + '!images?start=1&count=200'
         image_dicts = get_reply_from_url(url)['Response']['AlbumImage']
         return image_dicts
 
@@ -108,7 +112,7 @@ def get_node_for_year(year: int) -> dict:
     # kelp_node = 'rTwcc'  # from https://api.smugmug.com/api/v2/node/vNzZp!children
     sound_iq_kelp_node = 'xVcZmc'  # from https://api.smugmug.com/api/v2/node/rTwcc!children
 
-    node_url = 'https://api.smugmug.com/api/v2/node/' + sound_iq_kelp_node + '!children'
+    node_url = rt_args.smugmug_api_host + '/api/v2/node/' + sound_iq_kelp_node + '!children'
     rd = get_reply_from_url(node_url)
 
     yr_str = str(year)
@@ -121,7 +125,7 @@ def get_reply_from_url(url: str) -> dict:
     sm_payload = {'APIKey': rt_args.smug_mug_key}
     sm_headers = {'Accept': 'application/json'}
 
-    r = requests.get(url, params=sm_payload, headers=sm_headers)
+    r = session.get(url, params=sm_payload, headers=sm_headers)
 
     if r.status_code != 200:
         print("Query failed due to: {}", r.reason)
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from models.anchor_row import AnchoringSurvey
 from io import StringIO
@@ -12,7 +12,7 @@ class AnchoringLog:
     anchoring_data: dict
 
     # https://stackoverflow.com/questions/19926089/python-equivalent-of-java-stringbuffer
-    str_buffer: StringIO = StringIO()
+    str_buffer: StringIO = field(default_factory=StringIO)
 
     def write_log(self, target: str):
         f = open(target, 'w', encoding="utf-8")
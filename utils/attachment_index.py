@@ -0,0 +1,150 @@
+import hashlib
+import os
+import pickle
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import runtime_args as rt_args
+
+# Index of a KoboToolbox attachment download for finding a submission's files by (submission uuid, file name).  Kobo
+# puts each submission's attachments in a directory named by its uuid (<user>/attachments/<form>/<uuid>/<file>), so
+# same-named files from different submissions are kept apart.  A name without a uuid match (e.g. a flat directory of
+# attachments) is found by name only when exactly one file has it.
+#
+# The listing is saved (attachment_index_dir in runtime_args.py) with each directory's modification time.  Later runs
+# list again only the directories whose mtime changed, so opening an unchanged download costs a stat per directory.
+index_version = 1
+
+# a directory modified this close to its listing may change again without its mtime changing, so it is listed again
+racy_ns = 2 * 1000 * 1000 * 1000
+
+invalid_chars = [":", ",", "(", ")", "°", "'", "?"]
+
+
+@lru_cache(maxsize=None)
+def kobo_file_name(file_name: str) -> str:
+    """The name KoboToolbox stores an uploaded file under: without the characters it removes, and spaces as '_'."""
+    clean_str = file_name
+    for c in invalid_chars:
+        clean_str = clean_str.replace(c, "")
+
+    return clean_str.replace(" ", "_")
+
+
+@dataclass
+class AttachmentIndex:
+    root: str
+    version: int = index_version
+    dirs: dict = field(default_factory=dict)      # path relative to root -> (mtime_ns, sub directories, file names)
+    files: dict = field(default_factory=dict)     # (directory name, file name) -> directory relative to root
+    by_name: dict = field(default_factory=dict)   # file name -> directory relative to root, None when in several
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def find(self, file_name: str, uuid: str = '') -> str:
+        """Path of the submission's attachment, raising KeyError when it is missing or its name is ambiguous."""
+        name = kobo_file_name(file_name)
+        rel = self.files.get((uuid, name)) if uuid else None
+        if rel is None:
+            rel = self.by_name[name]
+            if rel is None:
+                raise KeyError(file_name)
+
+        return os.path.join(self.root, rel, name)
+
+    def refresh(self) -> int:
+        """Lists the directories that are new or changed since the last refresh, returning how many were listed."""
+        dirs = {}
+        listed = 0
+        now = time.time_ns()
+        pending = ['']
+        while pending:
+            rel = pending.pop()
+            path = os.path.join(self.root, rel)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+
+            entry = self.dirs.get(rel)
+            if entry is None or entry[0] != mtime:
+                entry = (mtime if now - mtime > racy_ns else -1,) + list_dir(path)
+                listed += 1
+            dirs[rel] = entry
+            pending.extend(os.path.join(rel, d) for d in entry[1])
+
+        changed = listed > 0 or dirs.keys() != self.dirs.keys()
+        self.dirs = dirs
+        if changed:
+            self.build()
+
+        return listed
+
+    def build(self):
+        files = {}
+        by_name = {}
+        for rel, (_, _, names) in self.dirs.items():
+            uuid = os.path.basename(rel)
+            for name in names:
+                files[(uuid, name)] = rel
+                by_name[name] = None if name in by_name else rel
+
+        self.files = files
+        self.by_name = by_name
+
+
+def list_dir(path: str) -> tuple:
+    sub_dirs = []
+    names = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                sub_dirs.append(entry.name)
+            elif entry.is_file():
+                names.append(entry.name)
+
+    return tuple(sub_dirs), tuple(names)
+
+
+def index_path(root: str) -> str:
+    key = hashlib.blake2b(os.path.abspath(root).encode('utf-8'), digest_size=16).hexdigest()
+    return os.path.join(rt_args.attachment_index_dir, key + '.pkl')
+
+
+def read_index(root: str) -> AttachmentIndex:
+    try:
+        with open(index_path(root), 'rb') as f:
+            index = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+    if not isinstance(index, AttachmentIndex) or index.version != index_version or index.root != root:
+        return None
+
+    return index
+
+
+def write_index(index: AttachmentIndex):
+    path = index_path(index.root)
+    os.makedirs(rt_args.attachment_index_dir, exist_ok=True)
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def load_index(root: str) -> AttachmentIndex:
+    """The index of the attachment directory, revalidated against the directories' mtimes, with the time printed."""
+    start = time.perf_counter()
+    index = read_index(root) if rt_args.attachment_index_enabled else None
+    if index is None:
+        index = AttachmentIndex(root)
+
+    listed = index.refresh()
+    if listed > 0 and rt_args.attachment_index_enabled:
+        write_index(index)
+    print('\t\tindexed {} attachments ({} of {} directories listed) in {:.2f}s'
+          .format(len(index), listed, len(index.dirs), time.perf_counter() - start))
+
+    return index
@@ -0,0 +1,183 @@
+import ctypes
+import ctypes.util
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Copies attachment files on a bounded pool of worker threads.  Callers resolve paths and report missing files
+# themselves, in order, before submitting, so only the byte copying runs concurrently.  At most pending_per_worker
+# copies per worker are queued; submit() blocks beyond that.
+#
+# In 'link' mode the output shares the attachments' data instead of duplicating it: a reflink (copy on write clone,
+# on btrfs, xfs, APFS, ...) where the filesystem supports it, else a hardlink, else a regular copy.  Hardlinked
+# output files are the attachment files, so they must not be edited in place.
+#
+# With a manifest (utils/copy_manifest.py) files recorded as unchanged are not copied again, and each file copied is
+# recorded, hashed on the worker thread.
+#
+# busy holds the [start, end] perf_counter times during which at least one copy was in flight, for timelines.
+pending_per_worker = 4
+copy_modes = ('copy', 'link')
+
+FICLONE = 0x40049409  # linux/fs.h
+
+# (source device, destination device) -> first method that worked, so unsupported methods are tried once per run
+link_methods = {}
+
+
+def reflink(src: str, dest: str) -> bool:
+    if sys.platform.startswith('linux'):
+        import fcntl
+        try:
+            with open(src, 'rb') as s, open(dest, 'wb') as d:
+                fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            if os.path.exists(dest): os.remove(dest)
+            return False
+    elif sys.platform == 'darwin':
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        if libc.clonefile(os.fsencode(src), os.fsencode(dest), 0) != 0:
+            return False
+    else:
+        return False
+
+    shutil.copystat(src, dest)
+    return True
+
+
+def hardlink(src: str, dest: str) -> bool:
+    try:
+        os.link(src, dest)
+    except OSError:
+        return False
+
+    return True
+
+
+def link_file(src: str, dest: str) -> str:
+    """Reflinks, hardlinks or copies src to dest, returning the method used."""
+    if os.path.lexists(dest): os.remove(dest)
+
+    devices = (os.stat(src).st_dev, os.stat(os.path.dirname(os.path.abspath(dest))).st_dev)
+    known = link_methods.get(devices)
+
+    if known in (None, 'reflink') and reflink(src, dest):
+        link_methods[devices] = 'reflink'
+        return 'reflink'
+    if known in (None, 'reflink', 'hardlink') and hardlink(src, dest):
+        link_methods[devices] = 'hardlink'
+        return 'hardlink'
+
+    link_methods[devices] = 'copy'
+    shutil.copy2(src, dest)
+    return 'copy'
+
+
+def transfer(src: str, dest: str, mode: str) -> str:
+    if mode == 'link':
+        return link_file(src, dest)
+
+    # copying over a hardlink left by an earlier link run would write through to the attachment
+    if os.path.lexists(dest) and os.lstat(dest).st_nlink > 1: os.remove(dest)
+    shutil.copy2(src, dest)
+    return 'copy'
+
+
+class CopyEngine:
+    def __init__(self, workers: int, progress_every: int = 500, mode: str = 'copy'):
+        if mode not in copy_modes:
+            raise ValueError('Unknown copy mode {}, expected one of {}'.format(mode, copy_modes))
+
+        self.workers = workers
+        self.mode = mode
+        self.manifest = None
+        self.progress_every = progress_every
+        self.submitted = 0
+        self.copied = 0
+        self.methods = Counter()
+        self.errors = []
+        self.busy = []
+        self._in_flight = 0
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(max(workers, 1) * pending_per_worker)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def submit(self, src: str, dest: str):
+        self.submitted += 1
+        with self._lock:
+            if self._in_flight == 0:
+                self.busy.append([time.perf_counter(), None])
+            self._in_flight += 1
+
+        if self.workers <= 1:
+            self._run(src, dest)
+            return
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='copy')
+
+        self._slots.acquire()
+        self._pool.submit(self._copy, src, dest)
+
+    def _transfer(self, src: str, dest: str) -> str:
+        if self.manifest is not None and self.manifest.is_current(src, dest, self.mode):
+            return 'unchanged'
+
+        method = transfer(src, dest, self.mode)
+        if self.manifest is not None:
+            self.manifest.record(src, dest, method)
+
+        return method
+
+    def _run(self, src: str, dest: str):
+        # every submitted copy is counted as done, failed or not, so wait() returns and raises the first error
+        method = None
+        try:
+            method = self._transfer(src, dest)
+        except Exception as e:
+            with self._lock:
+                self.errors.append(e)
+        finally:
+            self._copied(method)
+
+    def _copy(self, src: str, dest: str):
+        try:
+            self._run(src, dest)
+        finally:
+            self._slots.release()
+
+    def _copied(self, method: str):
+        with self._lock:
+            self.copied += 1
+            self._in_flight -= 1
+            if self._in_flight == 0:
+                self.busy[-1][1] = time.perf_counter()
+            if method is not None: self.methods[method] += 1
+            if self.progress_every > 0 and self.copied % self.progress_every == 0:
+                print('\t\tcopied {} of {} files'.format(self.copied, self.submitted))
+            self._idle.notify_all()
+
+    def wait(self) -> int:
+        """Blocks until every submitted copy is done, raising the first copy error.  Returns the number copied."""
+        with self._lock:
+            while self.copied < self.submitted:
+                self._idle.wait()
+            errors, self.errors = self.errors, []
+
+        if errors:
+            raise errors[0]
+
+        return self.copied
+
+    def reset(self):
+        self.wait()
+        self.submitted = 0
+        self.copied = 0
+        self.methods = Counter()
+        self.busy = []
@@ -0,0 +1,167 @@
+import glob
+import hashlib
+import json
+import mmap
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from utils.copy_engine import link_methods
+
+# Record of the attachment files copied (or linked) into an output directory: for each file its source, the source's
+# size and mtime, its own size and mtime, and a hash of its contents.  Re-runs skip files whose source and copy are
+# both unchanged since they were recorded, and verify.py re-hashes the output tree against it.
+#
+# Linked files share their data with the attachment (see utils/copy_engine.py), so only copies are hashed; a linked
+# file's size is still checked.
+#
+# Entries are also appended to copyManifest.jsonl as each file is copied, and folded into copyManifest.json when the
+# copies finish, so a run that dies part way keeps the record of the files it did copy.  Worker processes copying
+# into the same directory (see utils/county_pool.py) each append to their own copyManifest.<worker>.jsonl, and only
+# the parent folds them in.
+manifest_name = 'copyManifest.json'
+journal_name = 'copyManifest.jsonl'
+
+
+def journal_path(root: str, worker: str = '') -> str:
+    return os.path.join(root, 'copyManifest.{}.jsonl'.format(worker) if worker else journal_name)
+
+
+def journal_paths(root: str) -> list:
+    return sorted(glob.glob(os.path.join(glob.escape(root), 'copyManifest*.jsonl')))
+
+hash_chunk_bytes = 1024 * 1024
+mmap_min_bytes = 8 * 1024 * 1024
+
+
+def file_hash(path: str) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= mmap_min_bytes:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                h.update(m)
+        else:
+            for chunk in iter(lambda: f.read(hash_chunk_bytes), b''):
+                h.update(chunk)
+
+    return h.hexdigest()
+
+
+@dataclass
+class CopyManifest:
+    root: str
+    entries: dict = field(default_factory=dict)   # destination relative to root ('/' separated) -> entry
+    changed: bool = False
+    worker: str = ''
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    journal: object = field(default=None, repr=False)
+
+    def key(self, dest: str) -> str:
+        return os.path.relpath(dest, self.root).replace(os.sep, '/')
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split('/'))
+
+    def is_current(self, src: str, dest: str, mode: str) -> bool:
+        """True when dest was recorded from src, and neither has changed since."""
+        entry = self.entries.get(self.key(dest))
+        if entry is None or entry['src'] != os.path.abspath(src):
+            return False
+        # a copy run replaces hardlinks left by a link run
+        if mode == 'copy' and entry['method'] == 'hardlink':
+            return False
+
+        try:
+            s = os.stat(src)
+            d = os.stat(dest)
+        except FileNotFoundError:
+            return False
+
+        # a link run replaces copies left by a copy run, unless only copying works between the two drives
+        if mode == 'link' and entry['method'] == 'copy' and link_methods.get((s.st_dev, d.st_dev)) != 'copy':
+            return False
+
+        return ((s.st_size, s.st_mtime_ns, d.st_size, d.st_mtime_ns) ==
+                (entry['src_size'], entry['src_mtime_ns'], entry['size'], entry['mtime_ns']))
+
+    def record(self, src: str, dest: str, method: str):
+        s = os.stat(src)
+        d = os.stat(dest)
+        entry = {'src': os.path.abspath(src),
+                 'src_size': s.st_size,
+                 'src_mtime_ns': s.st_mtime_ns,
+                 'size': d.st_size,
+                 'mtime_ns': d.st_mtime_ns,
+                 'method': method,
+                 'hash': file_hash(dest) if method == 'copy' else None}
+
+        key = self.key(dest)
+        with self.lock:
+            self.entries[key] = entry
+            self.changed = True
+            if self.journal is None:
+                self.journal = open(journal_path(self.root, self.worker), 'a', encoding='utf-8')
+            self.journal.write(json.dumps({key: entry}) + '\n')
+            self.journal.flush()
+
+    def check(self, key: str) -> str:
+        """'missing' or 'corrupt' when the recorded file is, else ''."""
+        entry = self.entries[key]
+        path = self.path(key)
+        try:
+            size = os.stat(path).st_size
+        except FileNotFoundError:
+            return 'missing'
+
+        if size != entry['size'] or (entry['hash'] is not None and file_hash(path) != entry['hash']):
+            return 'corrupt'
+
+        return ''
+
+
+def load_manifest(root: str, worker: str = '') -> CopyManifest:
+    manifest = CopyManifest(root, worker=worker)
+    path = os.path.join(root, manifest_name)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            manifest.entries = json.load(f)
+
+    # files recorded by a run (or its workers) since the manifest was last saved
+    for path in journal_paths(root):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    manifest.entries.update(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        manifest.changed = True
+
+    return manifest
+
+
+def save_manifest(manifest: CopyManifest):
+    if not manifest.changed or manifest.worker:
+        return
+
+    path = os.path.join(manifest.root, manifest_name)
+    with manifest.lock:
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest.entries, f)
+        os.replace(path + '.tmp', path)
+        manifest.changed = False
+
+        if manifest.journal is not None:
+            manifest.journal.close()
+            manifest.journal = None
+        for path in journal_paths(manifest.root):
+            os.remove(path)
+
+
+def verify(manifest: CopyManifest, workers: int) -> dict:
+    """Re-hashes the recorded files on worker threads, returning {key: 'missing' or 'corrupt'} for the bad ones."""
+    keys = sorted(manifest.entries)
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        results = pool.map(manifest.check, keys)
+
+        return {key: result for key, result in zip(keys, results) if result}
@@ -0,0 +1,73 @@
+import contextlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import runtime_args as rt_args
+from utils.rate_limiter import HostRateLimiter
+
+# Runs each county's work in a pool of county_workers processes.  Counties write to their own output directories,
+# so they are independent; results are returned, and each county's printed output shown, in county order whatever
+# order they finish in.
+#
+# Workers are spawned (not forked, which would copy the parent's threads, sessions and NOAA cache connection) and
+# start with the parent's runtime_args values, so settings changed at run time (e.g. by batch.py) apply to them.
+# NOAA's request rate and concurrency limits are shared out between the workers, so together they stay within them.
+
+
+def runtime_settings() -> dict:
+    return {k: v for k, v in vars(rt_args).items()
+            if not k.startswith('_') and isinstance(v, (bool, int, float, str, list, tuple, dict, type(None)))}
+
+
+def init_worker(settings: dict, workers: int):
+    vars(rt_args).update(settings)
+
+    rt_args.noaa_requests_per_second /= workers
+    rt_args.noaa_workers = max(rt_args.noaa_workers // workers, 1)
+
+    # the main module (and with it the NOAA fetcher) is imported before this runs
+    import noaa.api_fetcher as naf
+    naf.rate_limiter = HostRateLimiter(rt_args.noaa_requests_per_second)
+
+
+def captured(work, *args) -> tuple:
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        result = work(*args)
+
+    return result, output.getvalue()
+
+
+def run_counties(work, jobs: dict, workers: int, on_result=None) -> dict:
+    """
+    {county: work(*args)} for jobs {county: args}.  on_result(county, result) is called in this process as each
+    county finishes (e.g. to journal it).  When a county fails the others still finish, then its error is raised.
+    """
+    context = multiprocessing.get_context('spawn')
+    workers = max(min(workers, len(jobs)), 1)
+    finished = dict()
+    errors = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=init_worker,
+                             initargs=(runtime_settings(), workers)) as pool:
+        futures = {pool.submit(captured, work, *args): cty for cty, args in jobs.items()}
+        for future in as_completed(futures):
+            cty = futures[future]
+            if future.exception() is not None:
+                errors.append(future.exception())
+                continue
+
+            finished[cty] = future.result()
+            if on_result is not None:
+                on_result(cty, finished[cty][0])
+
+    if errors:
+        raise errors[0]
+
+    results = dict()
+    for cty in sorted(finished.keys()):
+        result, output = finished[cty]
+        print(output, end='')
+        results[cty] = result
+
+    return results
@@ -1,59 +1,117 @@
 import os
 import pathlib
-import shutil
 
+import runtime_args as rt_args
+from utils.attachment_index import AttachmentIndex, load_index
+from utils.copy_engine import CopyEngine
+import utils.copy_manifest as cm
+
+# attachment directory -> its AttachmentIndex, loaded once per directory and shared by every export using it
 kobo_attachment_files = {}
 
+# (submission uuid, attachment file name) -> path it was copied to, for the export being processed
 normalized_attachment_files = {}
 
+# copies run on copy_workers threads; missing files are still reported in order, as they are found
+copier = CopyEngine(rt_args.copy_workers)
+
+# False when the export's files are already in the output directory (a resumed run past its copies): attachments
+# are still found and their destinations recorded, but nothing is copied
+copying = True
+
+
+def init_attachment_files(src: str) -> AttachmentIndex:
+    if src not in kobo_attachment_files:
+        kobo_attachment_files[src] = load_index(src)
 
-def init_attachment_files(src: str):
-    for root, dirs, files in os.walk(src):
-        for file in files:
-            kobo_attachment_files[file] = os.path.join(root, file)
+    return kobo_attachment_files[src]
 
 
-def find_attachment_path(file_name: str) -> str:
-    return normalized_attachment_files[file_name]
+def forget_copied_files(copy_mode: str = 'copy', output_dir: str = '', worker: str = '', copy_files: bool = True):
+    """Starts an export's copies.  With an output directory, files already copied there unchanged are skipped."""
+    global copying
+    copier.reset()
+    copier.mode = copy_mode
+    use_manifest = output_dir and rt_args.copy_manifest_enabled and copy_files
+    copier.manifest = cm.load_manifest(output_dir, worker) if use_manifest else None
+    copying = copy_files
+    normalized_attachment_files.clear()
 
 
-def find_path(file_name: str) -> str:
-    # KoboToolbox modifies specified file names for export.  Do what they do to the filename
-    search_name = remove_invalid_chars(file_name)
-    search_name = search_name.replace(" ", "_")
+def has_copy_manifest(output_dir: str) -> bool:
+    """True when an earlier run recorded its copies in output_dir, so re-running into it updates it."""
+    if not rt_args.copy_manifest_enabled:
+        return False
 
-    return kobo_attachment_files[search_name]
+    return os.path.exists(os.path.join(output_dir, cm.manifest_name)) or len(cm.journal_paths(output_dir)) > 0
 
-def remove_invalid_chars(file_name: str) -> str:
-    invalid_chars = [":", ",", ":", "(", ")", "°", "'", "?"]
 
-    clean_str = file_name
-    for c in invalid_chars:
-        clean_str = clean_str.replace(c, "")
+def find_attachment_path(file_name: str, uuid: str = '') -> str:
+    return normalized_attachment_files[(uuid, file_name)]
 
-    return clean_str
 
-def copy_file_if_exists(prefix: str, src: str, dest: str, file_name: str, new_name: str):
-    if not kobo_attachment_files:
-        init_attachment_files(src)
+def find_path(file_name: str, src: str, uuid: str = '') -> str:
+    # KoboToolbox modifies specified file names for export; the index looks them up under the name Kobo gives them
+    return init_attachment_files(src).find(file_name, uuid)
 
+def copy_file_if_exists(prefix: str, src: str, dest: str, file_name: str, new_name: str, uuid: str = ''):
     try:
-        file_path = find_path(file_name)
+        file_path = find_path(file_name, src, uuid)
         target_name = prefix + new_name + pathlib.Path(file_name).suffix.lower()
         full_dest = os.path.join(dest, target_name)
-        shutil.copy2(file_path, full_dest)
+        if copying:
+            copier.submit(file_path, full_dest)
 
-        normalized_attachment_files[file_name] = full_dest
+        normalized_attachment_files[(uuid, file_name)] = full_dest
     except KeyError:
         print("Failed to find path for file: " + file_name)
 
+
+def finish_copies() -> int:
+    """Waits for the submitted copies and saves the copy manifest.  Returns the number of files copied."""
+    copied = copier.wait()
+    if copier.manifest is not None:
+        cm.save_manifest(copier.manifest)
+
+    return copied
+
+
+def merge_worker_copies():
+    """Saves the copy manifest with the files recorded by worker processes (see utils/county_pool.py)."""
+    if copier.manifest is not None:
+        cm.save_manifest(cm.load_manifest(copier.manifest.root))
+
+
+def copy_intervals() -> list:
+    """When copies were in flight, as [start, end] perf_counter times."""
+    return list(copier.busy)
+
+
+def copy_report() -> str:
+    """Waits for the submitted copies and describes them, with the link methods used in link mode."""
+    copied = finish_copies()
+    unchanged = copier.methods['unchanged']
+    if copier.mode != 'link':
+        report = '{} files copied'.format(copied - unchanged)
+    else:
+        methods = ', '.join('{} {}'.format(k, v) for k, v in sorted(copier.methods.items()) if k != 'unchanged')
+        report = '{} files linked ({})'.format(copied - unchanged, methods if methods else 'none')
+
+    return report + (', {} unchanged.'.format(unchanged) if unchanged > 0 else '.')
+
 def copy_beach_images_to(dest: str):
     def is_beach_image(name: str) -> bool:
         return '_ToBe.' in name
 
+    # the album is copied from the output directory, so its copies must be done first
+    copier.wait()
+
     files_to_copy = filter(is_beach_image, normalized_attachment_files.values())
     for sf in files_to_copy:
         fn = os.path.basename(sf)
         fd = os.path.join(dest, fn)
-        shutil.copy2(sf, fd)
+        if copying:
+            copier.submit(sf, fd)
+
+    copier.wait()
 
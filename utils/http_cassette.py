@@ -0,0 +1,124 @@
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+import runtime_args as rt_args
+
+# Record/replay transport for the NOAA and SmugMug sessions, so runs can be benchmarked without the live services.
+#
+#   record - requests go to the network, and every request/response pair is appended to the cassette
+#   replay - responses come from the cassette (optionally with injected latency and errors); nothing is sent
+#
+# A cassette is a JSON lines file, one interaction per line.  Interactions are keyed by method, path and sorted
+# query, without the host, so the same cassette can also be served by replay_server.py.  Secret query parameters
+# are never written to the cassette.
+redacted_params = {'APIKey'}
+
+
+def interaction_key(method: str, url: str) -> str:
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in redacted_params)
+    return method.upper() + ' ' + parts.path + ('?' + urlencode(query) if query else '')
+
+
+def load_cassette(path: str) -> dict:
+    interactions = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    interactions[rec['key']] = rec
+
+    return interactions
+
+
+class Cassette:
+    def __init__(self, path: str, latency_secs: float = 0.0, error_rate: float = 0.0):
+        self.path = path
+        self.latency_secs = latency_secs
+        self.error_rate = error_rate
+        self.interactions = load_cassette(path)
+        self._lock = threading.Lock()
+
+    def record(self, key: str, status: int, reason: str, headers: dict, body: str):
+        rec = {'key': key, 'status': status, 'reason': reason, 'headers': headers, 'body': body}
+        with self._lock:
+            self.interactions[key] = rec
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(rec) + '\n')
+
+    def playback(self, key: str) -> dict:
+        """The recorded interaction after the injected latency, a 503 for injected errors, or a 404 when absent."""
+        if self.latency_secs > 0.0:
+            time.sleep(self.latency_secs)
+
+        if self.error_rate > 0.0 and random.random() < self.error_rate:
+            return {'status': 503, 'reason': 'Injected Error', 'headers': {}, 'body': '{"error": "injected"}'}
+
+        rec = self.interactions.get(key)
+        if rec is None:
+            return {'status': 404, 'reason': 'Not In Cassette', 'headers': {}, 'body': '{"error": "not recorded"}'}
+
+        return rec
+
+
+class CassetteAdapter(BaseAdapter):
+    def __init__(self, cassette: Cassette, mode: str):
+        super().__init__()
+        self.cassette = cassette
+        self.mode = mode
+        self.http = HTTPAdapter(pool_maxsize=rt_args.noaa_workers)
+
+    def send(self, request, **kwargs):
+        key = interaction_key(request.method, request.url)
+
+        if self.mode == 'record':
+            response = self.http.send(request, **kwargs)
+            headers = {'Content-Type': response.headers.get('Content-Type', 'application/json')}
+            self.cassette.record(key, response.status_code, response.reason, headers, response.text)
+            return response
+
+        return as_response(request, self.cassette.playback(key))
+
+    def close(self):
+        self.http.close()
+
+
+def as_response(request, rec: dict) -> requests.Response:
+    response = requests.Response()
+    response.status_code = rec['status']
+    response.reason = rec['reason']
+    response.headers = CaseInsensitiveDict(rec['headers'])
+    response._content = rec['body'].encode('utf-8')
+    response.encoding = 'utf-8'
+    response.url = request.url
+    response.request = request
+    return response
+
+
+_cassette = None
+
+
+def install(session: requests.Session):
+    """Mount the cassette transport on the session when runtime_args.http_cassette_mode is set."""
+    global _cassette
+    mode = rt_args.http_cassette_mode
+    if mode not in ('record', 'replay'):
+        return
+
+    if _cassette is None:
+        _cassette = Cassette(rt_args.http_cassette_path, rt_args.http_replay_latency_secs,
+                             rt_args.http_replay_error_rate)
+
+    adapter = CassetteAdapter(_cassette, mode)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
@@ -1,5 +1,5 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from io import StringIO
 from math import isnan
 
@@ -13,7 +13,7 @@ class KelpDataLog:
     kelp_data: dict
 
     # https://stackoverflow.com/questions/19926089/python-equivalent-of-java-stringbuffer
-    str_buffer: StringIO = StringIO()
+    str_buffer: StringIO = field(default_factory=StringIO)
 
     def log_records_filtered_by(self, title: str, filter_func):
         self.str_buffer.write("\n\n" + title + "\n")
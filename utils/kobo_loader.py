@@ -0,0 +1,107 @@
+import hashlib
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+from pandas import DataFrame
+
+import runtime_args as rt_args
+
+# Loads the columns a schema uses from a KoboToolbox "all versions" export.  The workbook is streamed in openpyxl's
+# read-only mode, reading only the schema's columns, and the parsed frame is cached under the hash of the file's
+# contents, so re-running on an unchanged export skips Excel parsing entirely.
+#
+# The cache is Parquet when pyarrow is installed, and a pickle otherwise (or when a column mixes types that Parquet
+# cannot store).
+hash_chunk_bytes = 1024 * 1024
+
+# cell text pd.read_excel reads as missing by default
+na_strings = {'', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN', '<NA>', 'N/A',
+              'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'}
+
+
+def content_hash(path: str, columns: list) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(hash_chunk_bytes), b''):
+            h.update(chunk)
+    h.update('\t'.join(columns).encode('utf-8'))
+
+    return h.hexdigest()
+
+
+def read_export(path: str, columns: list) -> DataFrame:
+    """The named columns of the workbook's first sheet; names missing from the export are left out."""
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, ())
+        wanted = set(columns)
+        indexes = [i for i, name in enumerate(header) if name in wanted]
+
+        values = [[] for _ in indexes]
+        for row in rows:
+            if all(v is None for v in row):
+                continue
+            for col_values, i in zip(values, indexes):
+                v = row[i] if i < len(row) else None
+                col_values.append(np.nan if v is None or (isinstance(v, str) and v in na_strings) else v)
+    finally:
+        wb.close()
+
+    return DataFrame({header[i]: pd.Series(col_values) for i, col_values in zip(indexes, values)})
+
+
+def cache_paths(key: str) -> tuple:
+    base = os.path.join(rt_args.kobo_cache_dir, key)
+    return base + '.parquet', base + '.pkl'
+
+
+def read_cached(key: str) -> DataFrame:
+    parquet_path, pickle_path = cache_paths(key)
+    if os.path.exists(parquet_path):
+        try:
+            return pd.read_parquet(parquet_path)
+        except ImportError:
+            pass
+    if os.path.exists(pickle_path):
+        return pd.read_pickle(pickle_path)
+
+    return None
+
+
+def write_cached(key: str, df: DataFrame):
+    parquet_path, pickle_path = cache_paths(key)
+    os.makedirs(rt_args.kobo_cache_dir, exist_ok=True)
+
+    try:
+        df.to_parquet(parquet_path + '.tmp')
+        os.replace(parquet_path + '.tmp', parquet_path)
+        return
+    except (ImportError, ValueError, TypeError):
+        if os.path.exists(parquet_path + '.tmp'): os.remove(parquet_path + '.tmp')
+
+    df.to_pickle(pickle_path + '.tmp', protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(pickle_path + '.tmp', pickle_path)
+
+
+def load_export(path: str, schema: list) -> DataFrame:
+    """The schema's columns of the export, from the cache when the file is unchanged, with the load time printed."""
+    start = time.perf_counter()
+    columns = [spec.name for spec in schema]
+    key = content_hash(path, columns)
+
+    df = read_cached(key) if rt_args.kobo_cache_enabled else None
+    if df is not None:
+        print('\t\tloaded {} rows from the export cache in {:.2f}s (warm)'.format(len(df), time.perf_counter() - start))
+        return df
+
+    df = read_export(path, columns)
+    if rt_args.kobo_cache_enabled:
+        write_cached(key, df)
+    print('\t\tparsed {} rows from the export in {:.2f}s (cold)'.format(len(df), time.perf_counter() - start))
+
+    return df
@@ -0,0 +1,141 @@
+import csv
+import json
+import queue
+import threading
+
+import numpy as np
+import pandas as pd
+import requests
+from pandas import DataFrame
+
+import runtime_args as rt_args
+import utils.http_cassette as hc
+from utils.kobo_loader import load_export
+
+# Kobo submissions as a stream of DataFrame pages, so surveys can be extracted and attachments copied while later
+# pages are still downloading.  Sources are
+#   kobo:<asset uid>    the KoboToolbox v2 data API (paged JSON, see kobo_api_host in runtime_args.py)
+#   *.csv               a CSV export (',' or ';' separated), read in chunks
+#   *.jsonl             one JSON submission per line, read in chunks
+#   *.json              a JSON list of submissions (or an API style {"results": [...]}) read as a whole
+#   *.xlsx              an Excel export, read with utils.kobo_loader as a single page
+#
+# Pages are fetched on a background thread into a queue of at most kobo_prefetch_pages pages, so memory is
+# bounded by the page size, whatever the size of the project.
+api_prefix = 'kobo:'
+
+# Kobo JSON and CSV values are text; these are read as timestamps, like the Excel export's date cells
+date_columns = ['survey_date', '_submission_time']
+
+session = requests.Session()
+hc.install(session)
+
+
+def api_data_url(source: str) -> str:
+    asset_uid = source[len(api_prefix):].strip()
+    return '{}/api/v2/assets/{}/data.json'.format(rt_args.kobo_api_host.rstrip('/'), asset_uid)
+
+
+def api_pages(source: str) -> iter:
+    headers = {'Accept': 'application/json'}
+    if rt_args.kobo_api_token:
+        headers['Authorization'] = 'Token ' + rt_args.kobo_api_token
+
+    url = api_data_url(source)
+    params = {'limit': rt_args.kobo_page_size, 'start': 0}
+    while url:
+        response = session.get(url, params=params, headers=headers, timeout=rt_args.kobo_timeout_secs)
+        response.raise_for_status()
+        reply = response.json()
+
+        yield DataFrame(reply.get('results', []))
+
+        # 'next' already carries the paging parameters
+        url = reply.get('next')
+        params = None
+
+
+def csv_pages(path: str) -> iter:
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        separator = csv.Sniffer().sniff(f.readline(), delimiters=',;\t').delimiter
+
+    for page in pd.read_csv(path, sep=separator, chunksize=rt_args.kobo_page_size, encoding='utf-8-sig'):
+        yield page
+
+
+def json_lines_pages(path: str) -> iter:
+    rows = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                rows.append(json.loads(line))
+            if len(rows) == rt_args.kobo_page_size:
+                yield DataFrame(rows)
+                rows = []
+
+    if rows:
+        yield DataFrame(rows)
+
+
+def json_pages(path: str) -> iter:
+    with open(path, encoding='utf-8') as f:
+        submissions = json.load(f)
+    if isinstance(submissions, dict):
+        submissions = submissions.get('results', [])
+
+    for i in range(0, len(submissions), rt_args.kobo_page_size):
+        yield DataFrame(submissions[i:i + rt_args.kobo_page_size])
+
+
+def raw_pages(source: str, schema: list) -> iter:
+    if source.startswith(api_prefix): return api_pages(source)
+
+    suffix = source.lower().rsplit('.', 1)[-1]
+    if suffix == 'csv': return csv_pages(source)
+    if suffix == 'jsonl': return json_lines_pages(source)
+    if suffix == 'json': return json_pages(source)
+
+    return iter([load_export(source, schema)])
+
+
+def normalized_page(page: DataFrame, first_index: int) -> DataFrame:
+    """Columns named like the Excel export ("XML values and headers"), with its _index and date types."""
+    # Kobo JSON names answers inside groups "group_name/question_name"
+    page = page.rename(columns=lambda c: str(c).rsplit('/', 1)[-1])
+    page = page.loc[:, ~page.columns.duplicated()]
+
+    if '_index' not in page.columns:
+        page['_index'] = np.arange(first_index, first_index + len(page))
+    for label in date_columns:
+        if label in page.columns and not pd.api.types.is_datetime64_any_dtype(page[label]):
+            page[label] = pd.to_datetime(page[label], errors='coerce', utc=True).dt.tz_localize(None)
+
+    return page.replace({None: np.nan})
+
+
+def export_pages(source: str, schema: list) -> iter:
+    """DataFrame pages of the source with the schema's columns, fetched ahead on a background thread."""
+    pages = queue.Queue(maxsize=max(rt_args.kobo_prefetch_pages, 1))
+    done = object()
+    wanted = [spec.name for spec in schema]
+
+    def fetch():
+        try:
+            first_index = 1
+            for page in raw_pages(source, schema):
+                page = normalized_page(page, first_index)
+                first_index += len(page)
+                pages.put(page[[c for c in wanted if c in page.columns]])
+            pages.put(done)
+        except Exception as e:
+            pages.put(e)
+
+    threading.Thread(target=fetch, daemon=True).start()
+
+    while True:
+        page = pages.get()
+        if page is done:
+            return
+        if isinstance(page, Exception):
+            raise page
+        yield page
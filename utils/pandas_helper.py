@@ -1,4 +1,8 @@
-from pandas import Series
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame, Series
 
 
 def get_column_or_default(ds: Series, label: str, default: str = None) -> str :
@@ -22,3 +26,75 @@ def as_float_or_default(obj, default: float = float("NaN")) -> float:
         return default
 
     return obj
+
+
+# Column-at-a-time version of as_string_or_default, for cleaning a whole DataFrame column
+def as_strings_or_default(col: Series, default: str = None) -> list:
+    # clean each distinct value once; missing values get code -1, which picks the default appended at the end
+    codes, uniques = pd.factorize(col, use_na_sentinel=True)
+    cleaned = [as_string_or_default(v, default) for v in uniques]
+    cleaned.append('' if default is None else default)
+
+    return np.array(cleaned, dtype=object)[codes].tolist()
+
+
+# Declarative cleaning of a whole KoboToolbox export, done once before any models are built.  String columns are
+# stripped with blanks and 'nan' replaced by the default, float columns are numeric with missing values replaced by
+# the default, and 'raw' columns are left as exported.  Columns missing from the export are added, filled with the
+# default, so the models can read every column without checking for it.
+@dataclass(frozen=True)
+class ColumnSpec:
+    name: str
+    kind: str = 'str'       # 'str', 'float' or 'raw'
+    default: object = None  # '' for str and raw columns, NaN for float columns
+    first_year: int = None  # first and last collection years exporting the column, None when open ended
+    last_year: int = None
+
+    def fill_value(self):
+        if self.default is not None: return self.default
+        return float("NaN") if self.kind == 'float' else ''
+
+    def dated(self) -> bool:
+        return self.first_year is not None or self.last_year is not None
+
+    def applies_to(self, year: int) -> bool:
+        if year is None: return True
+        after_first = self.first_year is None or self.first_year <= year
+        before_last = self.last_year is None or year <= self.last_year
+        return after_first and before_last
+
+
+def clean_column(col: Series, spec: ColumnSpec) -> Series:
+    if spec.kind == 'str':
+        values = as_strings_or_default(col, spec.fill_value())
+    elif spec.kind == 'float':
+        values = pd.to_numeric(col, errors='coerce').astype(object)
+        values = values.where(values.notna(), spec.fill_value()).tolist()
+    else:
+        return col
+
+    return Series(values, index=col.index, dtype=object)
+
+
+def apply_schema(df: DataFrame, schema: list, year: int = None) -> DataFrame:
+    """
+    Returns a copy of the DataFrame with the schema's columns cleaned, or the DataFrame itself when they already
+    are.  Columns the schema dates to the year but missing from the export are listed in attrs['missing_columns'].
+    """
+    done = df.attrs.get('cleaned_columns', frozenset())
+    todo = [spec for spec in schema if spec.name not in done]
+    if len(todo) == 0:
+        return df
+
+    cleaned = df.copy()
+    missing = list(df.attrs.get('missing_columns', []))
+    for spec in todo:
+        if spec.name in cleaned.columns:
+            cleaned[spec.name] = clean_column(cleaned[spec.name], spec)
+        else:
+            if year is not None and spec.dated() and spec.applies_to(year): missing.append(spec.name)
+            cleaned[spec.name] = Series([spec.fill_value()] * len(cleaned), index=cleaned.index, dtype=object)
+
+    cleaned.attrs['cleaned_columns'] = done | frozenset(spec.name for spec in todo)
+    cleaned.attrs['missing_columns'] = missing
+    return cleaned
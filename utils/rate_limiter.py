@@ -0,0 +1,25 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class HostRateLimiter:
+    """Spaces requests to each host at least 1 / requests_per_second apart, across all threads"""
+
+    def __init__(self, requests_per_second: float):
+        self.min_interval = 0.0 if requests_per_second <= 0 else 1.0 / requests_per_second
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        if self.min_interval == 0.0:
+            return
+
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+
+        if slot > now:
+            time.sleep(slot - now)
@@ -0,0 +1,75 @@
+import json
+import os
+from dataclasses import asdict, dataclass, field
+
+# Journal of a kelp.py run in its output directory, appended to as each unit of work completes, so a run that dies
+# part way (a NOAA timeout, a full disk, a laptop going to sleep) continues with kelp.py --resume.  It holds the run's
+# parameters, the stages completed, and each county's GIS worksheet rows as they are computed.  Copied files are
+# journaled by the copy manifest (utils/copy_manifest.py) and NOAA replies by the NOAA cache, so a resumed run skips
+# those too.  The journal is removed when the run finishes.
+journal_name = 'kelpJournal.jsonl'
+
+
+@dataclass
+class RunJournal:
+    path: str
+    params: dict = field(default_factory=dict)
+    stages: list = field(default_factory=list)
+    gis: dict = field(default_factory=dict)   # _uuid -> {'hash': row hash, 'gis': GIS worksheet row}, as kelpManifest
+    file: object = field(default=None, repr=False)
+
+    def append(self, entry: dict):
+        if self.file is None:
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def completed(self, stage: str):
+        self.stages.append(stage)
+        self.append({'stage': stage})
+
+    def record_gis(self, surveys: list, gis_data: list, hashes: dict):
+        entries = {s.uuid: {'hash': hashes[s.uuid], 'gis': asdict(g)} for s, g in zip(surveys, gis_data)}
+        self.gis.update(entries)
+        self.append({'gis': entries})
+
+    def last_stage(self) -> str:
+        return self.stages[-1] if self.stages else 'none'
+
+    def finish(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def start_journal(dest: str, params: dict) -> RunJournal:
+    os.makedirs(dest, exist_ok=True)
+    journal = RunJournal(os.path.join(dest, journal_name), params)
+    with open(journal.path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'params': params}) + '\n')
+
+    return journal
+
+
+def load_journal(dest: str) -> RunJournal:
+    """The journal of an interrupted run in dest, or None."""
+    path = os.path.join(dest, journal_name)
+    if not os.path.exists(path):
+        return None
+
+    journal = RunJournal(path)
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break  # the line being written when the run died
+
+            if 'params' in entry: journal.params = entry['params']
+            if 'stage' in entry: journal.stages.append(entry['stage'])
+            if 'gis' in entry: journal.gis.update(entry['gis'])
+
+    return journal
@@ -0,0 +1,39 @@
+import json
+import os
+from dataclasses import asdict
+
+import pandas as pd
+from pandas import DataFrame
+
+# Record of the submissions processed into an output directory, so an incremental run only copies attachments and
+# adjusts depths for new or changed submissions.  Each _uuid maps to a hash of the submission's cleaned columns and
+# the GIS worksheet row computed for it.
+manifest_name = 'kelpManifest.json'
+
+
+def row_hashes(df: DataFrame, columns: list) -> dict:
+    """_uuid -> hash of the row's values in the columns."""
+    hashes = pd.util.hash_pandas_object(df[columns].astype(str), index=False)
+    return {uuid: '{:016x}'.format(h) for uuid, h in zip(df["_uuid"].tolist(), hashes.tolist())}
+
+
+def load_manifest(dest: str) -> dict:
+    path = os.path.join(dest, manifest_name)
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(dest: str, hashes: dict, surveys: list, gis_data: list):
+    manifest = {s.uuid: {'hash': hashes[s.uuid], 'gis': asdict(g)} for s, g in zip(surveys, gis_data)}
+
+    path = os.path.join(dest, manifest_name)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    os.replace(path + '.tmp', path)
+
+
+def is_unchanged(manifest: dict, uuid: str, row_hash: str) -> bool:
+    return uuid in manifest and manifest[uuid]['hash'] == row_hash
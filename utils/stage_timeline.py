@@ -0,0 +1,81 @@
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+# When each stage of a run was busy, printed as a timeline to show how much the stages overlap.  A stage started and
+# ended several times (e.g. once per page) is busy only between each start and its end; starts nested in an open
+# one (from several threads) extend it.  The time gained by overlapping is the stages' busy time added up, less the
+# time during which any of them was busy.
+bar_width = 40
+
+
+@dataclass
+class StageTimeline:
+    origin: float = field(default_factory=time.perf_counter)
+    stages: dict = field(default_factory=dict)   # stage name -> [[start, end], ...], seconds since origin
+    open_counts: dict = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def start(self, name: str):
+        now = time.perf_counter() - self.origin
+        with self.lock:
+            if self.open_counts.get(name, 0) == 0:
+                self.stages.setdefault(name, []).append([now, now])
+            self.open_counts[name] = self.open_counts.get(name, 0) + 1
+
+    def end(self, name: str):
+        now = time.perf_counter() - self.origin
+        with self.lock:
+            if self.open_counts.get(name, 0) == 0:
+                return
+            self.open_counts[name] -= 1
+            self.stages[name][-1][1] = now
+
+    @contextmanager
+    def stage(self, name: str):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def add(self, name: str, intervals: list):
+        """Busy intervals measured elsewhere, as [start, end] perf_counter times (end None while still busy)."""
+        with self.lock:
+            self.stages.setdefault(name, []).extend([start - self.origin, end - self.origin]
+                                                    for start, end in intervals if end is not None)
+
+    def lines(self) -> list:
+        stages = sorted(((name, sorted(spans)) for name, spans in self.stages.items() if spans),
+                        key=lambda s: s[1][0][0])
+        elapsed = max([end for _, spans in stages for _, end in spans] + [1e-9])
+        lines = []
+        for name, spans in stages:
+            cells = [' '] * bar_width
+            for start, end in spans:
+                first = min(int(start / elapsed * bar_width), bar_width - 1)
+                last = max(int(end / elapsed * bar_width), first + 1)
+                cells[first:last] = '#' * (last - first)
+
+            busy = sum(end - start for start, end in spans)
+            lines.append('{:<20} {:6.1f}s - {:6.1f}s {:6.1f}s busy |{}|'
+                         .format(name, spans[0][0], max(end for _, end in spans), busy, ''.join(cells)))
+
+        stage_secs = sum(end - start for _, spans in stages for start, end in spans)
+        busy_secs = covered_secs([span for _, spans in stages for span in spans])
+        lines.append('stages were busy {:.1f}s in {:.1f}s of {:.1f}s: {:.1f}s gained by overlapping them'
+                     .format(stage_secs, busy_secs, elapsed, stage_secs - busy_secs))
+        return lines
+
+
+def covered_secs(spans: list) -> float:
+    """Time covered by at least one of the [start, end] spans."""
+    covered = 0.0
+    reached = float('-inf')
+    for start, end in sorted(spans):
+        if end > reached:
+            covered += end - max(start, reached)
+            reached = end
+
+    return covered
@@ -0,0 +1,36 @@
+"""
+Check the attachment files in an output directory written by kelp.py or anchoring.py against its copyManifest.json:
+every recorded file is re-hashed on verify_workers threads, and missing or corrupt files are listed.  Re-running
+kelp.py or anchoring.py (not incremental) into the same directory copies them again.
+"""
+import sys
+import time
+
+import runtime_args as rt_args
+import utils.copy_manifest as cm
+
+
+def main():
+    data_year: int = rt_args.select_collection_year()
+    output_dir = rt_args.select_target_dir(data_year)
+
+    manifest = cm.load_manifest(output_dir)
+    rt_args.print_runtime_args([("Target", output_dir),
+                                ("Recorded Files", str(len(manifest.entries))),
+                                ("Workers", str(rt_args.verify_workers))])
+
+    start = time.perf_counter()
+    problems = cm.verify(manifest, rt_args.verify_workers)
+    print('\n\tchecked {} files in {:.1f}s.'.format(len(manifest.entries), time.perf_counter() - start))
+
+    for key, problem in problems.items():
+        print('\t\t{}: {}'.format(problem, key))
+    print('\t{} missing, {} corrupt.'.format(sum(1 for p in problems.values() if p == 'missing'),
+                                            sum(1 for p in problems.values() if p == 'corrupt')))
+
+    print('Done.')
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())